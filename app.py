@@ -2,6 +2,9 @@ import streamlit as st
 import pandas as pd
 import plotly.express as px
 from data_consolidator import DataConsolidator
+from parse_cache import ParseCache
+from mapping_store import MappingStore
+from master_store import MasterStore
 # Baserow-related imports removed
 from typing import Dict, List
 import io
@@ -18,6 +21,27 @@ st.set_page_config(
     initial_sidebar_state="expanded"
 )
 
+# Number of worker processes used to parse uploaded files in parallel. Each
+# consolidation starts a fresh spawn pool (~0.5 s of pandas imports), which only
+# pays off for several large workbooks, so uploads are parsed in-process by default
+INGEST_WORKERS = int(os.environ.get('INGEST_WORKERS', 1))
+
+# Local storage for caches that should survive app restarts
+DATA_DIR = Path(os.environ.get('CRM_DATA_DIR', Path(__file__).parent / '.crm_data'))
+PARSE_CACHE_MAX_MB = int(os.environ.get('PARSE_CACHE_MAX_MB', 1024))
+# Point replicas at a shared path to share learned header mappings
+MAPPING_STORE_PATH = os.environ.get('MAPPING_STORE_PATH', DATA_DIR / 'learned_mappings.json')
+# Store the master sheet as categoricals / Arrow strings instead of Python str objects
+COMPACT_STORAGE = os.environ.get('COMPACT_STORAGE', '1') != '0'
+# Consolidations of at least this many rows go to an on-disk store instead of memory
+OUT_OF_CORE_ROWS = int(os.environ.get('OUT_OF_CORE_ROWS', 1_000_000))
+MASTER_MEMORY_BUDGET_MB = int(os.environ.get('MASTER_MEMORY_BUDGET_MB', 256))
+# Normalize emails, phones, URLs and countries as they enter the master sheet
+NORMALIZE_FIELDS = os.environ.get('NORMALIZE_FIELDS', '1') != '0'
+# Column statistics of larger master sheets use sketches (estimated distinct counts and top values);
+# by default exactly the ones consolidated out of core
+APPROXIMATE_STATS_ROWS = int(os.environ.get('APPROXIMATE_STATS_ROWS', OUT_OF_CORE_ROWS))
+
 # Performance optimization: Cache CSS to avoid reloading
 @st.cache_data(show_spinner=False)
 def load_custom_css():
@@ -855,7 +879,14 @@ tbody td {
 @st.cache_resource
 def get_consolidator():
     """Cache the DataConsolidator instance for performance"""
-    return DataConsolidator()
+    parse_cache = ParseCache(DATA_DIR / 'parse_cache', max_bytes=PARSE_CACHE_MAX_MB * 1024 * 1024)
+    mapping_store = MappingStore(MAPPING_STORE_PATH)
+    master_store = MasterStore(DATA_DIR / 'master.sqlite', memory_budget_mb=MASTER_MEMORY_BUDGET_MB,
+                               approximate_rows=APPROXIMATE_STATS_ROWS)
+    return DataConsolidator(parse_cache=parse_cache, mapping_store=mapping_store,
+                            compact_storage=COMPACT_STORAGE, master_store=master_store,
+                            out_of_core_rows=OUT_OF_CORE_ROWS, normalize_fields=NORMALIZE_FIELDS,
+                            approximate_stats_rows=APPROXIMATE_STATS_ROWS)
 
 # Initialize session state
 if 'consolidator' not in st.session_state:
@@ -1075,8 +1106,30 @@ def upload_and_process_page():
                 </div>
                 """, unsafe_allow_html=True)
         
+        # Files added after consolidating are appended without rebuilding the master sheet
+        if st.session_state.consolidated and st.button("➕ Append New Files to Master Sheet"):
+            result = st.session_state.consolidator.append_files(uploaded_files)
+        
+            if result['success']:
+                st.session_state.master_data = result['data']
+                st.session_state.summary = result['summary']
+                # The mapping page builds its mapping from these; without the new headers
+                # the next Apply would drop their columns
+                st.session_state.headers = sorted(set(st.session_state.headers) | set(result['new_headers']))
+                st.session_state.auto_mappings = {**st.session_state.auto_mappings, **result['auto_mappings']}
+                st.session_state.mapping_suggestions = {
+                    **st.session_state.mapping_suggestions, **result['mapping_suggestions']
+                }
+                st.success(f"✅ Appended {result['appended_rows']:,} rows")
+                if result['new_headers']:
+                    st.info(f"Auto-mapped new headers: {', '.join(result['new_headers'])}")
+            else:
+                st.error(f"❌ Error appending files: {result['error']}")
+        
         if st.button("🔄 Process Files", type="primary"):
-            result = st.session_state.consolidator.process_files(uploaded_files)
+            result = st.session_state.consolidator.process_files(
+                uploaded_files, max_workers=INGEST_WORKERS, headers_only=True
+            )
             
             if result['success']:
                 st.session_state.processed = True
@@ -1167,11 +1220,30 @@ def header_mapping_page():
                 )
                 mapping[header] = mapped_header
         
+        # Changed mappings are always learned; suggestions only when confirmed here
+        confirmed_headers = st.multiselect(
+            "Remember these suggested mappings for future uploads",
+            options=[header for header in headers if mapping[header] == auto_mappings.get(header, header)],
+            format_func=lambda header: f"{header} → {mapping[header] or 'not mapped'}",
+            help="Mappings you changed above are remembered automatically"
+        )
+        
         # Submit button
         if st.form_submit_button("✅ Apply Mapping", type="primary"):
-            st.session_state.consolidator.update_header_mapping(mapping)
+            st.session_state.consolidator.update_header_mapping(mapping, confirmed_headers)
             st.success("Header mapping updated!")
             
+            # An existing master sheet only rebuilds the columns whose mapping changed
+            if st.session_state.consolidated:
+                result = st.session_state.consolidator.consolidate_data()
+                if result['success']:
+                    st.session_state.master_data = result['data']
+                    st.session_state.summary = result['summary']
+                    if result.get('updated_columns'):
+                        st.info(f"Updated master sheet columns: {', '.join(result['updated_columns'])}")
+                else:
+                    st.error(f"❌ Error updating master sheet: {result['error']}")
+            
             # Show mapping summary
             with st.expander("📊 Mapping Summary"):
                 df_mapping = pd.DataFrame([
@@ -1213,6 +1285,30 @@ def master_sheet_page():
                 return
     
     if st.session_state.consolidated:
+        # Deduplicate before reading master_data so the metrics below reflect it
+        if not st.session_state.consolidator.out_of_core:
+            fuzzy_dedupe = st.checkbox(
+                "Also merge near-duplicate names at the same organization",
+                help="Matches e.g. 'Jon Smith @ Acme Inc' with 'John Smith @ ACME, Inc.'"
+            )
+            merge_duplicates = st.checkbox(
+                "Merge duplicates into one best record",
+                help="Keeps the most complete phone number, the latest title and all skills and "
+                     "technologies; source file and sheet list every merged row"
+            )
+        if not st.session_state.consolidator.out_of_core and st.button("🧹 Remove Duplicates"):
+            result = st.session_state.consolidator.deduplicate_data(fuzzy=fuzzy_dedupe, merge=merge_duplicates)
+            
+            if result['success']:
+                st.session_state.master_data = result['data']
+                st.session_state.summary = result['summary']
+                st.success(f"✅ Removed {result['duplicates_removed']:,} duplicate rows")
+                if not result['report'].empty:
+                    with st.expander("Merge report"):
+                        st.dataframe(result['report'], use_container_width=True)
+            else:
+                st.error(f"❌ Error removing duplicates: {result['error']}")
+        
         master_data = st.session_state.master_data
         summary = st.session_state.summary
         
@@ -1287,7 +1383,10 @@ def master_sheet_page():
         
         # Display data
         st.subheader("📋 Data Preview")
-        st.info(f"Showing all {len(filtered_data)} rows")
+        if st.session_state.consolidator.out_of_core:
+            st.info(f"Showing the first {len(filtered_data):,} rows; exports include every matching row")
+        else:
+            st.info(f"Showing all {len(filtered_data)} rows")
         
         # Data table view - show all data without restrictions and start index from 1
         st.markdown("**Data Table View:**")
@@ -1305,19 +1404,24 @@ def master_sheet_page():
             if st.button("📊 Download as Excel", type="secondary"):
                 # Use display_data to ensure the order is preserved exactly as shown in the preview
                 export_data = filtered_data.copy().reset_index(drop=True)
-                excel_data = st.session_state.consolidator.export_data(export_data, 'xlsx')
-                st.download_button(
-                    label="📥 Download Excel File",
-                    data=excel_data,
-                    file_name="consolidated_data.xlsx",
-                    mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
-                )
+                try:
+                    excel_data = st.session_state.consolidator.export_data(export_data, 'xlsx', filters)
+                except ValueError as e:
+                    # More rows than an Excel worksheet holds
+                    st.error(f"❌ {e}")
+                else:
+                    st.download_button(
+                        label="📥 Download Excel File",
+                        data=excel_data,
+                        file_name="consolidated_data.xlsx",
+                        mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+                    )
         
         with col2:
             if st.button("📝 Download as CSV", type="secondary"):
                 # Use filtered_data to ensure the order is preserved exactly as shown in the preview
                 export_data = filtered_data.copy().reset_index(drop=True)
-                csv_data = st.session_state.consolidator.export_data(export_data, 'csv')
+                csv_data = st.session_state.consolidator.export_data(export_data, 'csv', filters)
                 st.download_button(
                     label="📥 Download CSV File",
                     data=csv_data,
@@ -1351,26 +1455,25 @@ def analytics_page():
     
     # Calculate data completeness
     completeness_data = []
-    for col in master_data.columns:
-        if col not in ['source_file', 'source_sheet']:
-            try:
-                col_series = master_data[col]
-                if isinstance(col_series, pd.DataFrame):
-                    col_series = col_series.iloc[:, 0]
-                non_empty = col_series.astype(str).str.strip().ne('').sum()
-                completeness = (non_empty / len(master_data)) * 100
-                completeness_data.append({
-                    'Column': col,
-                    'Completeness (%)': round(completeness, 1),
-                    'Non-empty Values': non_empty,
-                    'Total Values': len(master_data)
-                })
-            except Exception:
-                # Skip problematic columns
+    if st.session_state.consolidator.out_of_core:
+        # master_data is only a preview; the summary counts every stored row
+        summary = st.session_state.summary
+        for col, info in summary.get('column_info', {}).items():
+            completeness_data.append({
+                'Column': col,
+                'Completeness (%)': round(info['non_empty_values'] / summary['total_rows'] * 100, 1),
+                'Non-empty Values': info['non_empty_values'],
+                'Total Values': summary['total_rows']
+            })
+    else:
+        # Profiles are cached until the master data changes, so reruns reuse them
+        profiles = st.session_state.consolidator.get_column_profiles()
+        for col, profile in profiles.items():
+            if col not in ['source_file', 'source_sheet']:
                 completeness_data.append({
                     'Column': col,
-                    'Completeness (%)': 0,
-                    'Non-empty Values': 0,
+                    'Completeness (%)': round(profile['non_empty_values'] / len(master_data) * 100, 1),
+                    'Non-empty Values': profile['non_empty_values'],
                     'Total Values': len(master_data)
                 })
     
@@ -1410,7 +1513,7 @@ def analytics_page():
     """, unsafe_allow_html=True)
     
     # File distribution with adaptive theme colors - centered, no second pie chart
-    file_counts = master_data['source_file'].value_counts()
+    file_counts = st.session_state.consolidator.get_value_counts('source_file')
     fig_files = px.pie(
         values=file_counts.values,
         names=file_counts.index,
@@ -1444,6 +1547,7 @@ def analytics_page():
     
     if selected_column:
         stats = st.session_state.consolidator.get_column_stats(selected_column)
+        approximate = stats.get('approximate')
         
         col1, col2, col3 = st.columns(3)
         with col1:
@@ -1451,11 +1555,20 @@ def analytics_page():
         with col2:
             st.metric("Non-empty Values", stats['non_empty_values'])
         with col3:
-            st.metric("Unique Values", stats['unique_values'])
+            if approximate:
+                relative_error = approximate['unique_values_relative_error']
+                st.metric("Unique Values (estimated)", f"≈{stats['unique_values']:,}",
+                          help=f"HyperLogLog estimate, ±{relative_error:.1%} standard error "
+                               f"(±{2 * relative_error:.1%} at 95% confidence)")
+            else:
+                st.metric("Unique Values", stats['unique_values'])
         
         # Show most common values
         if stats['most_common']:
             st.write("**Most Common Values:**")
+            if approximate:
+                st.caption(f"Estimated from a sketch: each count is at most "
+                           f"{approximate['most_common_max_undercount']:,} below the true count")
             for value, count in stats['most_common'].items():
                 st.write(f"• {value}: {count} occurrences")
         
@@ -1476,7 +1589,7 @@ def analytics_page():
                 st.metric("Std Dev", f"{numeric_stats['std']:.2f}")
             
             # Create histogram for numeric data with adaptive theme colors
-            numeric_data = pd.to_numeric(master_data[selected_column], errors='coerce').dropna()
+            numeric_data = st.session_state.consolidator.get_numeric_values(selected_column)
             fig_hist = px.histogram(
                 x=numeric_data,
                 nbins=30,
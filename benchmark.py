@@ -0,0 +1,625 @@
+#!/usr/bin/env python3
+"""
+Benchmark script for the ingestion and consolidation pipeline
+
+Usage:
+    python benchmark.py              # run every benchmark
+    python benchmark.py workbook     # run a single benchmark by name
+"""
+
+import gc
+import io
+import multiprocessing
+import random
+import re
+import resource
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from fuzzywuzzy import fuzz
+
+from deduplicator import Deduplicator, _strip_org_suffix
+from column_profile import ColumnProfiler, profile_column
+from field_normalizer import normalize_field
+from header_mapper import HeaderMapper
+from parse_cache import ParseCache
+from spreadsheet_processor import SpreadsheetProcessor
+
+
+def _time_call(func, repeat: int = 3) -> float:
+    """Return the best wall-clock time of several runs in seconds"""
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def _make_workbook(sheet_count: int, rows: int = 200) -> io.BytesIO:
+    """Build an in-memory workbook with the given number of sheets"""
+    frame = pd.DataFrame({
+        'First Name': [f'Name {i}' for i in range(rows)],
+        'Email': [f'user{i}@example.com' for i in range(rows)],
+        'Company': [f'Company {i % 17}' for i in range(rows)],
+        'Employees': list(range(rows)),
+    })
+    buffer = io.BytesIO()
+    with pd.ExcelWriter(buffer, engine='openpyxl') as writer:
+        for i in range(sheet_count):
+            frame.to_excel(writer, sheet_name=f'Sheet{i + 1}', index=False)
+    buffer.name = f'workbook_{sheet_count}.xlsx'
+    return buffer
+
+
+def _read_workbook_per_sheet(buffer: io.BytesIO) -> list:
+    """Previous reader: one read_excel call (and workbook parse) per sheet"""
+    excel_file = pd.ExcelFile(buffer)
+    return [pd.read_excel(buffer, sheet_name=name) for name in excel_file.sheet_names]
+
+
+def bench_workbook(sheet_counts=(1, 5, 10, 20, 30)):
+    """Time vs. sheet count for the per-sheet and single-pass workbook readers"""
+    processor = SpreadsheetProcessor()
+    print(f"{'sheets':>8} {'per-sheet (s)':>15} {'single-pass (s)':>17} {'speedup':>9}")
+    for sheet_count in sheet_counts:
+        buffer = _make_workbook(sheet_count)
+        legacy = _time_call(lambda: _read_workbook_per_sheet(buffer), repeat=1)
+        single = _time_call(lambda: processor.read_workbook(buffer, buffer.name), repeat=1)
+        print(f"{sheet_count:>8} {legacy:>15.3f} {single:>17.3f} {legacy / single:>8.1f}x")
+
+
+def bench_parse_cache(rows: int = 200_000, sheet_count: int = 10):
+    """Re-upload cost with and without the content-addressed parse cache"""
+    csv_frame = pd.DataFrame({
+        'Email': [f'user{i}@example.com' for i in range(rows)],
+        'Company': [f'Company {i % 97}' for i in range(rows)],
+        'Employees': [i % 5000 for i in range(rows)],
+    })
+    csv_upload = io.BytesIO(csv_frame.to_csv(index=False).encode('utf-8'))
+    csv_upload.name = 'contacts.csv'
+    uploads = [csv_upload, _make_workbook(sheet_count, rows=2000)]
+
+    with tempfile.TemporaryDirectory() as cache_dir:
+        uncached = SpreadsheetProcessor()
+        cached = SpreadsheetProcessor(ParseCache(cache_dir))
+
+        parse_time = _time_call(lambda: uncached.process_uploaded_files(uploads), repeat=1)
+        cached.process_uploaded_files(uploads)
+        hit_time = _time_call(lambda: cached.process_uploaded_files(uploads))
+
+    print(f"Full parse:  {parse_time * 1000:>8.1f} ms")
+    print(f"Cache hit:   {hit_time * 1000:>8.1f} ms ({parse_time / hit_time:.0f}x faster)")
+
+
+def _make_headers(count: int, seed: int = 0) -> list:
+    """Generate distinct, realistic-looking vendor headers"""
+    rng = random.Random(seed)
+    mapper = HeaderMapper()
+    words = sorted({
+        word for variations in mapper.header_mapping_patterns.values()
+        for variation in variations for word in re.split(r'[^a-z0-9]+', variation.lower()) if word
+    })
+    separators = [' ', '_', '-', '.', '']
+    headers = set()
+    while len(headers) < count:
+        parts = rng.sample(words, rng.randint(1, 3))
+        header = rng.choice(separators).join(parts)
+        headers.add(header.title() if rng.random() < 0.5 else header)
+    return sorted(headers)
+
+
+def _legacy_map_and_suggest(mapper: HeaderMapper, headers: list):
+    """Previous matcher: normalizes every variation with a regex inside the loops"""
+    def normalize(header):
+        return re.sub(r'[^a-zA-Z0-9]', '_', str(header).lower().strip())
+
+    for header in headers:
+        normalized_header = normalize(header)
+        if any(normalized_header == normalize(h) for h in mapper.required_headers):
+            continue
+        for variations in mapper.header_mapping_patterns.values():
+            for variation in variations:
+                fuzz.ratio(normalized_header, normalize(variation))
+
+    for header in headers:
+        normalized_header = normalize(header)
+        for standard_header in mapper.required_headers:
+            fuzz.ratio(normalized_header, normalize(standard_header))
+            for variation in mapper.header_mapping_patterns.get(standard_header, []):
+                fuzz.ratio(normalized_header, normalize(variation))
+
+
+def bench_header_mapping(header_count: int = 5000):
+    """Auto-mapping plus suggestions for many distinct headers"""
+    mapper = HeaderMapper()
+    headers = _make_headers(header_count)
+
+    def indexed():
+        mapper.map_headers(headers)
+        mapper.get_mapping_suggestions(headers)
+
+    def brute_force_best_matches():
+        for header in headers:
+            mapper.get_top_matches(header, k=1, prune=False)
+
+    legacy = _time_call(lambda: _legacy_map_and_suggest(mapper, headers), repeat=1)
+    current = _time_call(indexed, repeat=1)
+    print(f"{header_count:,} headers")
+    print(f"Per-call regex normalization: {legacy:>7.2f} s")
+    print(f"Precomputed variation index:  {current:>7.2f} s ({legacy / current:.1f}x faster)")
+
+    brute_force = _time_call(brute_force_best_matches, repeat=1)
+    pruned = _time_call(lambda: mapper.map_headers(headers), repeat=1)
+    print("Auto-mapping only:")
+    print(f"  Scoring every variation:    {brute_force:>7.2f} s")
+    print(f"  N-gram shortlist:           {pruned:>7.2f} s ({brute_force / pruned:.1f}x faster)")
+
+    cold = _time_call(lambda: HeaderMapper().match_headers(headers), repeat=1)
+    warm = _time_call(lambda: mapper.match_headers(headers))
+    print("Single-pass mapping + suggestions (match_headers):")
+    print(f"  Cold:                       {cold:>7.2f} s")
+    print(f"  Memoized:                   {warm:>7.3f} s")
+
+
+def _legacy_consolidate(processor: SpreadsheetProcessor, processed_data: dict, header_mapping: dict) -> pd.DataFrame:
+    """Previous consolidation: copy, rename, reindex, concat, fillna and astype in turn"""
+    frames = []
+    for file_name, sheets in processed_data.items():
+        for sheet in sheets:
+            mapped_columns = processor.get_mapped_columns(sheet.columns, header_mapping)
+            sheet_copy = sheet.loc[:, [col in mapped_columns for col in sheet.columns]].copy()
+            sheet_copy.reset_index(drop=True, inplace=True)
+            mapped_sheet = sheet_copy.copy().rename(columns=header_mapping)
+            mapped_sheet['source_file'] = file_name
+            mapped_sheet['source_sheet'] = sheet.attrs.get('sheet_name', 'Sheet1')
+            frames.append(mapped_sheet.reindex(columns=processor.get_master_headers(), fill_value=''))
+    master_df = pd.concat(frames, ignore_index=True, sort=False).fillna('')
+    for col in master_df.columns:
+        master_df[col] = master_df[col].astype(str)
+    return master_df
+
+
+def _peak_rss_mb() -> float:
+    """Peak resident set size of this process in MB"""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Reported in KiB on Linux and in bytes on macOS
+    return peak / 1024 ** 2 if sys.platform == 'darwin' else peak / 1024
+
+
+def _consolidation_rss(variant: str, rows: int, sheet_count: int) -> tuple:
+    """Build sheets and consolidate them in a fresh process; return (input MB, peak growth MB)"""
+    rng = np.random.default_rng(0)
+    processed_data = {}
+    for i in range(sheet_count):
+        ids = np.arange(rows // sheet_count)
+        sheet = pd.DataFrame({
+            'Email': pd.Series(ids).map('user{}@example.com'.format),
+            'First Name': rng.choice(['Ann', 'Bob', 'Cy', 'Di'], len(ids)).astype(object),
+            'Company': pd.Series(ids % 997).map('Company {}'.format),
+            'Employees': rng.integers(1, 10_000, len(ids)),
+            'Notes': 'unmapped',
+        })
+        sheet.attrs['sheet_name'] = f'Sheet{i + 1}'
+        processed_data[f'vendor_{i}.csv'] = [sheet]
+    header_mapping = {'Email': 'email', 'First Name': 'first_name',
+                      'Company': 'organization_name', 'Employees': 'employees'}
+    processor = SpreadsheetProcessor()
+    gc.collect()
+    baseline = _peak_rss_mb()
+
+    if variant == 'legacy':
+        _legacy_consolidate(processor, processed_data, header_mapping)
+    else:
+        processor.consolidate_data(processed_data, header_mapping)
+    return baseline, _peak_rss_mb() - baseline
+
+
+def bench_consolidation_memory(rows: int = 3_000_000, sheet_count: int = 3):
+    """Peak RSS growth of the copy-per-stage and copy-free consolidation pipelines"""
+    # Each run gets a fresh process, because peak RSS never goes down
+    results = {}
+    for variant in ('legacy', 'copy_free'):
+        with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context('spawn')) as executor:
+            results[variant] = executor.submit(_consolidation_rss, variant, rows, sheet_count).result()
+
+    legacy_growth = results['legacy'][1]
+    copy_free_growth = results['copy_free'][1]
+    print(f"{rows:,} rows in {sheet_count} sheets (process RSS before consolidating: {results['legacy'][0]:.0f} MB)")
+    print(f"Copy per stage:  +{legacy_growth:>7.0f} MB peak RSS")
+    print(f"Copy-free:       +{copy_free_growth:>7.0f} MB peak RSS ({legacy_growth / copy_free_growth:.1f}x less)")
+
+
+def bench_compact_storage(rows: int = 1_000_000):
+    """Master sheet memory as Python str objects and in compact (categorical/Arrow) mode"""
+    rng = np.random.default_rng(0)
+    ids = np.arange(rows)
+    sheet = pd.DataFrame({
+        'Email': pd.Series(ids).map('user{}@example.com'.format),
+        'Country': rng.choice(['United States', 'Germany', 'India', 'Brazil'], rows).astype(object),
+        'Revenue': rng.choice(['$1M-$10M', '$10M-$50M', '$50M-$100M'], rows).astype(object),
+        'Employees': rng.integers(1, 10_000, rows),
+    })
+    processed_data = {'contacts.csv': [sheet]}
+    header_mapping = {'Email': 'email', 'Country': 'contact_country',
+                      'Revenue': 'estimated_revenue_range', 'Employees': 'employees'}
+    processor = SpreadsheetProcessor()
+
+    # memory_usage(deep=True) counts a shared '' object once per cell, which
+    # overstates the object layout; the consolidation_memory benchmark measures RSS
+    print(f"{rows:,} rows, pandas deep memory usage:")
+    for label, compact in (('Python str objects', False), ('Compact', True)):
+        start = time.perf_counter()
+        master = processor.consolidate_data(processed_data, header_mapping, compact=compact)
+        elapsed = time.perf_counter() - start
+        size = master.memory_usage(deep=True).sum() / 1e6
+        print(f"{label:<20} {size:>8.0f} MB  (built in {elapsed:.2f} s)")
+
+
+def _make_contacts(rows: int, duplicate_share: float = 0.3, seed: int = 0) -> pd.DataFrame:
+    """Synthetic master sheet where duplicate_share of the rows repeat an earlier contact
+
+    Each repeat matches its original on one of email (case and whitespace
+    changed), LinkedIn URL (scheme and query string added) or name + organization.
+    """
+    rng = np.random.default_rng(seed)
+    unique = int(rows * (1 - duplicate_share))
+    ids = np.concatenate([np.arange(unique), rng.integers(0, unique, rows - unique)])
+    repeat = np.arange(rows) >= unique
+    shared_key = np.where(repeat, rng.integers(0, 3, rows), -1)
+
+    ids_text = pd.Series(ids).astype(str)
+    email = 'user' + ids_text + '@example.com'
+    linkedin = 'linkedin.com/in/user' + ids_text
+    name = 'Person ' + ids_text
+    organization = 'Company ' + (pd.Series(ids) % 5000).astype(str)
+    # Repeats keep only their shared key, in a different spelling
+    return pd.DataFrame({
+        'email': email.where(~repeat, ' ' + email.str.upper()).where((shared_key == -1) | (shared_key == 0), ''),
+        'linkedin_url': linkedin.where(~repeat, 'https://www.' + linkedin + '?trk=x')
+                                .where((shared_key == -1) | (shared_key == 1), ''),
+        'full_name': name.where((shared_key == -1) | (shared_key == 2), ''),
+        'organization_name': organization.where((shared_key == -1) | (shared_key == 2), ''),
+        'source_file': 'vendor_' + (pd.Series(np.arange(rows)) % 4).astype(str) + '.csv',
+        'source_sheet': 'CSV',
+    })
+
+
+def bench_dedupe(row_counts=(250_000, 500_000, 1_000_000, 2_000_000)):
+    """Hash-indexed deduplication time as the master sheet grows, keeping first rows or merging"""
+    deduplicator = Deduplicator()
+    print(f"{'Rows':>10} {'Time (s)':>10} {'us/row':>8} {'Removed':>10} {'Golden records (s)':>20}")
+    for rows in row_counts:
+        contacts = _make_contacts(rows)
+        start = time.perf_counter()
+        deduped, _ = deduplicator.deduplicate(contacts)
+        elapsed = time.perf_counter() - start
+        start = time.perf_counter()
+        deduplicator.deduplicate(contacts, merge=True)
+        merge_elapsed = time.perf_counter() - start
+        print(f"{rows:>10,} {elapsed:>10.2f} {elapsed / rows * 1e6:>8.2f} {rows - len(deduped):>10,} "
+              f"{merge_elapsed:>20.2f}")
+
+
+_FIRST_NAMES = ['John', 'Jane', 'Michael', 'Sarah', 'David', 'Laura', 'Robert', 'Emily', 'Daniel', 'Anna',
+                'Thomas', 'Maria', 'James', 'Olivia', 'Peter', 'Sophie', 'Mark', 'Julia', 'Paul', 'Emma']
+_NAME_SYLLABLES = ['ber', 'son', 'man', 'dal', 'ford', 'ley', 'ton', 'wick', 'mor', 'gan',
+                   'hart', 'ing', 'ross', 'vel', 'kin']
+_ORG_WORDS = [
+    ['Blue', 'Silver', 'North', 'Bright', 'Prime', 'Green', 'Swift', 'Iron', 'Summit', 'Clear',
+     'Golden', 'Apex', 'Red', 'Pacific', 'Atlas', 'Nova', 'Cedar', 'Pioneer', 'Urban', 'Vertex'],
+    ['River', 'Peak', 'Stone', 'Bridge', 'Harbor', 'Field', 'Valley', 'Forest', 'Point', 'Lake',
+     'Ridge', 'Wave', 'Star', 'Cloud', 'Rock', 'Bay', 'Crest', 'Grove', 'Path', 'Gate'],
+    ['Systems', 'Labs', 'Partners', 'Logistics', 'Health', 'Capital', 'Media', 'Foods', 'Energy',
+     'Software', 'Consulting', 'Analytics', 'Robotics', 'Retail', 'Studios', 'Networks', 'Group',
+     'Holdings', 'Dynamics', 'Ventures'],
+]
+_ORG_SUFFIXES = ['Inc', 'Inc.', ', Inc.', 'LLC', 'Ltd', 'Corp', '']
+
+
+def _typo(values: pd.Series, rng) -> pd.Series:
+    """Drop, double or swap one character of each value"""
+    def change(value):
+        position = rng.integers(1, len(value) - 1)
+        kind = rng.integers(0, 3)
+        if kind == 0:
+            return value[:position] + value[position + 1:]
+        if kind == 1:
+            return value[:position] + value[position] + value[position:]
+        return value[:position - 1] + value[position] + value[position - 1] + value[position + 1:]
+    return values.map(change)
+
+
+def _make_noisy_contacts(rows: int, duplicate_share: float = 0.3, seed: int = 0) -> tuple:
+    """Synthetic CRM rows with misspelled repeats; returns (contacts, true entity id per row)
+
+    Repeats share no exact key with their original: the name has a typo or a
+    different case and the organization a different legal suffix.
+    """
+    rng = np.random.default_rng(seed)
+    entities = int(rows * (1 - duplicate_share))
+    entity = np.concatenate([np.arange(entities), rng.integers(0, entities, rows - entities)])
+    repeat = np.arange(rows) >= entities
+
+    first = pd.Series(rng.choice(_FIRST_NAMES, entities)[entity])
+    last = pd.Series(
+        [''.join(syllables) for syllables in rng.choice(_NAME_SYLLABLES, (entities, 3))]
+    )[entity].reset_index(drop=True).str.capitalize()
+    organization = pd.Series(
+        [' '.join(words) for words in zip(*(rng.choice(choices, entities) for choices in _ORG_WORDS))]
+    )[entity].reset_index(drop=True)
+    suffix = pd.Series(rng.choice(_ORG_SUFFIXES, rows))
+
+    full_name = first + ' ' + last
+    noisy_name = _typo(full_name[repeat], rng)
+    full_name[repeat] = noisy_name.where(rng.random(len(noisy_name)) < 0.7, full_name[repeat].str.upper())
+    contacts = pd.DataFrame({
+        'full_name': full_name,
+        'organization_name': organization + np.where(suffix.str.startswith(','), '', ' ') + suffix,
+        'source_file': 'vendor_' + (pd.Series(np.arange(rows)) % 4).astype(str) + '.csv',
+        'source_sheet': 'CSV',
+    })
+    return contacts, entity
+
+
+def _pair_precision_recall(labels: np.ndarray, entity: np.ndarray) -> tuple:
+    """Pairwise precision and recall of predicted clusters against the true entities"""
+    def pair_count(*keys):
+        sizes = pd.DataFrame(dict(enumerate(keys))).value_counts().to_numpy()
+        return int((sizes * (sizes - 1) // 2).sum())
+
+    true_positives = pair_count(labels, entity)
+    predicted, actual = pair_count(labels), pair_count(entity)
+    return true_positives / max(predicted, 1), true_positives / max(actual, 1)
+
+
+def bench_fuzzy_dedupe(row_counts=(25_000, 50_000, 100_000, 200_000), brute_force_rows: int = 2000):
+    """Blocked fuzzy matching on noisy CRM data: time, comparisons and pairwise precision/recall"""
+    deduplicator = Deduplicator()
+
+    # Baseline: every pair of rows through the same scorer, only feasible for small inputs
+    contacts, entity = _make_noisy_contacts(brute_force_rows)
+    name, organization = deduplicator._name_and_organization(contacts)
+    # Same suffix stripping as the matcher, so both score identical strings
+    organization = _strip_org_suffix(organization)
+    start = time.perf_counter()
+    first, second = np.triu_indices(brute_force_rows, k=1)
+    matched = np.array([
+        fuzz.ratio(name[a], name[b]) >= 85 and fuzz.ratio(organization[a], organization[b]) >= 85
+        for a, b in zip(first, second)
+    ], dtype=bool)
+    elapsed = time.perf_counter() - start
+    labels = deduplicator.merge_pairs(np.arange(brute_force_rows), first[matched], second[matched])
+    precision, recall = _pair_precision_recall(labels, entity)
+    print(f"All pairs, {brute_force_rows:,} rows: {len(first):,} comparisons in {elapsed:.2f} s, "
+          f"precision {precision:.3f}, recall {recall:.3f}")
+
+    print(f"\n{'Rows':>10} {'All pairs':>16} {'Time (s)':>10} {'us/row':>8} {'Precision':>10} {'Recall':>8}")
+    for rows in (brute_force_rows,) + tuple(row_counts):
+        contacts, entity = _make_noisy_contacts(rows)
+        start = time.perf_counter()
+        labels = deduplicator.find_clusters(contacts)
+        labels = deduplicator.merge_pairs(labels, *deduplicator.find_fuzzy_pairs(contacts, labels))
+        elapsed = time.perf_counter() - start
+        precision, recall = _pair_precision_recall(labels, entity)
+        print(f"{rows:>10,} {rows * (rows - 1) // 2:>16,} {elapsed:>10.2f} {elapsed / rows * 1e6:>8.1f} "
+              f"{precision:>10.3f} {recall:>8.3f}")
+
+
+def bench_field_normalization(rows: int = 1_000_000):
+    """Normalization throughput per field type, against plain stringification"""
+    rng = np.random.default_rng(0)
+    ids = pd.Series(np.arange(rows)).astype(str)
+    digits = pd.Series(rng.integers(2_000_000_000, 9_999_999_999, rows)).astype(str)
+    area, exchange, line = digits.str[:3], digits.str[3:6], digits.str[6:]
+    columns = {
+        'email': pd.Series(np.where(rng.random(rows) < 0.5, ' User', 'user')) + ids + '@Example.com',
+        'phone_numbers': pd.Series(np.select(
+            [rng.random(rows) < 0.25, rng.random(rows) < 0.33, rng.random(rows) < 0.5],
+            ['(' + area + ') ' + exchange + '-' + line, '+1 ' + area + '.' + exchange + '.' + line,
+             area + '-' + exchange + '-' + line + ' ext. 12'],
+            digits + '.0'
+        )),
+        'linkedin_url': pd.Series(np.where(rng.random(rows) < 0.5, 'https://www.', '')) +
+                        'linkedin.com/in/User' + ids + pd.Series(np.where(rng.random(rows) < 0.5, '/?trk=x', '/')),
+        'contact_country': pd.Series(rng.choice(['USA', 'us', 'United States', 'UK', 'Germany', 'de', 'Narnia'], rows)),
+    }
+    processor = SpreadsheetProcessor()
+
+    print(f"{rows:,} rows")
+    print(f"{'Field':<18} {'Stringify (rows/s)':>20} {'Normalize (rows/s)':>20} {'Changed':>9}")
+    for header, column in columns.items():
+        column = column.astype(object)
+        stringify = _time_call(lambda: processor._stringify_column(column))
+        normalize = _time_call(lambda: normalize_field(header, column))
+        changed = (normalize_field(header, column) != column).mean()
+        print(f"{header:<18} {rows / stringify:>20,.0f} {rows / normalize:>20,.0f} {changed:>8.0%}")
+
+
+def _legacy_column_scans(master: pd.DataFrame):
+    """Summary, analytics completeness and column stats as separate per-column scans"""
+    for _ in range(2):  # get_data_summary, then the analytics completeness loop
+        for column in master.columns:
+            master[column].astype(str).str.strip().ne('').sum()
+    for column in master.columns:
+        values = master[column]
+        values.astype(str).str.strip().ne('').sum()
+        values.nunique()
+        values.value_counts().head(5)
+        numeric = pd.to_numeric(values, errors='coerce')
+        if not numeric.isna().all():
+            numeric.mean(), numeric.median(), numeric.min(), numeric.max(), numeric.std()
+
+
+def bench_column_profile(rows: int = 1_000_000):
+    """Per-call-site column scans against one cached profile pass, with and without reruns"""
+    rng = np.random.default_rng(0)
+    ids = pd.Series(np.arange(rows)).astype(str)
+    master = pd.DataFrame({
+        'email': ('user' + ids + '@example.com').to_numpy(dtype=object),
+        'full_name': ('Person ' + (pd.Series(np.arange(rows)) % 200_000).astype(str)).to_numpy(dtype=object),
+        'contact_country': rng.choice(['United States', 'Germany', 'India', ''], rows).astype(object),
+        'employees': pd.Series(rng.integers(1, 10_000, rows)).astype(str).to_numpy(dtype=object),
+        'founded_year': pd.Series(rng.integers(1950, 2024, rows)).astype(str).to_numpy(dtype=object),
+        'title': rng.choice(['CEO', 'CTO', 'Engineer', 'Manager', ''], rows).astype(object),
+    })
+
+    legacy = _time_call(lambda: _legacy_column_scans(master), repeat=1)
+    profiler = ColumnProfiler()
+    cold = _time_call(lambda: profiler.get_profiles(master, version=object()), repeat=1)
+    version = object()
+    profiler.get_profiles(master, version)
+    warm = _time_call(lambda: profiler.get_profiles(master, version))
+
+    print(f"{rows:,} rows x {len(master.columns)} columns")
+    print(f"Per-call-site scans:     {legacy:.2f} s (every rerun)")
+    print(f"Column profiles (cold):  {cold:.2f} s")
+    print(f"Column profiles (cached): {warm * 1000:.3f} ms")
+
+
+def _make_text_column(rows: int) -> pd.Series:
+    """Long, mostly distinct free-text values with a few very common ones"""
+    rng = np.random.default_rng(0)
+    ids = pd.Series(rng.integers(0, rows // 2, rows)).astype(str)
+    text = ('Experienced professional focused on growth, partnerships and operations. Ref ' + ids)
+    common = rng.choice(['N/A', 'See website', ''], rows, p=[.5, .3, .2])
+    return pd.Series(np.where(rng.random(rows) < 0.15, common, text).astype(object))
+
+
+def bench_approximate_stats(rows: int = 5_000_000):
+    """Exact and sketch-based (HyperLogLog + frequent items) profiles of a long text column"""
+    import tracemalloc
+
+    column = _make_text_column(rows)
+    results = {}
+    for approximate in (False, True):
+        elapsed = _time_call(lambda: profile_column(column, approximate), repeat=1)
+        # tracemalloc sees numpy and pandas hash table allocations, but slows Python
+        # object creation, so memory is measured in a separate run
+        tracemalloc.start()
+        profile = profile_column(column, approximate)
+        peak = tracemalloc.get_traced_memory()[1] / 1e6
+        tracemalloc.stop()
+        results[approximate] = (elapsed, peak, profile)
+
+    exact = results[False][2]
+    print(f"{rows:,} rows of free text, {exact['unique_values']:,} distinct values")
+    print(f"{'Mode':<10} {'Time (s)':>9} {'Peak traced':>12} {'Distinct':>12} {'Top value count':>16}")
+    for approximate, (elapsed, peak, profile) in results.items():
+        top_count = next(iter(profile['most_common'].values()))
+        print(f"{'Sketches' if approximate else 'Exact':<10} {elapsed:>9.2f} {peak:>9.0f} MB "
+              f"{profile['unique_values']:>12,} {top_count:>16,}")
+
+    bounds = results[True][2]['approximate']
+    distinct_error = results[True][2]['unique_values'] / exact['unique_values'] - 1
+    print(f"Distinct count error {distinct_error:+.2%} (standard error "
+          f"{bounds['unique_values_relative_error']:.2%}); top counts at most "
+          f"{bounds['most_common_max_undercount']:,} low")
+
+
+def bench_shadow_columns(rows: int = 1_000_000):
+    """Numeric sort, stats and histogram values: per-call to_numeric against cached shadows"""
+    from data_consolidator import DataConsolidator
+
+    rng = np.random.default_rng(0)
+    employees = pd.Series(rng.integers(1, 10_000, rows)).astype(str)
+    master = pd.DataFrame({
+        'employees': employees.where(rng.random(rows) < 0.9, '').to_numpy(dtype=object),
+        'source_file': 'vendor.csv',
+    })
+    consolidator = DataConsolidator()
+    consolidator.master_data = master
+
+    def legacy_round():
+        # sort_data coerced twice, get_column_stats and the histogram once each
+        pd.to_numeric(master['employees'], errors='coerce')
+        master.sort_values('employees', key=lambda x: pd.to_numeric(x, errors='coerce'))
+        pd.to_numeric(master['employees'], errors='coerce').mean()
+        pd.to_numeric(master['employees'], errors='coerce').dropna()
+
+    def shadow_round():
+        consolidator.sort_data(master, 'employees')
+        consolidator.get_column_stats('employees')
+        consolidator.get_numeric_values('employees')
+
+    legacy = _time_call(legacy_round)
+    consolidator.master_data = master
+    cold = _time_call(shadow_round, repeat=1)
+    warm = _time_call(shadow_round)
+    print(f"{rows:,} rows: sort + stats + histogram values")
+    print(f"Coerce per call:      {legacy:.2f} s on every rerun")
+    print(f"Shadows (first call): {cold:.2f} s")
+    print(f"Shadows (cached):     {warm:.2f} s ({legacy / warm:.1f}x faster)")
+
+
+def bench_trigram_filter(rows: int = 1_000_000):
+    """Case-insensitive contains filters: column scan per rerun against the trigram index"""
+    from data_consolidator import DataConsolidator
+
+    master, _ = _make_noisy_contacts(rows)
+    consolidator = DataConsolidator()
+    consolidator.master_data = master
+    # Filter values as typed, one rerun per keystroke
+    typed = {
+        'full_name': ['mar', 'mark', 'mark ', 'mark h'],
+        'organization_name': ['sum', 'summ', 'summit'],
+    }
+    for column in typed:
+        start = time.perf_counter()
+        consolidator.profiler.get_text_index(master, consolidator.master_version, column)
+        print(f"Index build, {column}: {time.perf_counter() - start:.2f} s")
+
+    print(f"\n{rows:,} rows")
+    print(f"{'Column':>18} {'Filter':>8} {'Matches':>8} {'Scan (ms)':>10} {'Index (ms)':>11} {'Speedup':>8}")
+    for column, values in typed.items():
+        for value in values:
+            def scan():
+                return master[master[column].astype(str).str.contains(value, case=False, na=False)]
+            expected = scan()
+            filtered = consolidator.filter_data({column: value})
+            assert filtered.equals(expected)
+            scan_time = _time_call(scan)
+            index_time = _time_call(lambda: consolidator.filter_data({column: value}))
+            print(f"{column:>18} {value!r:>8} {len(filtered):>8,} {scan_time * 1000:>10.1f} "
+                  f"{index_time * 1000:>11.1f} {scan_time / index_time:>7.1f}x")
+
+
+BENCHMARKS = {
+    'workbook': bench_workbook,
+    'parse_cache': bench_parse_cache,
+    'header_mapping': bench_header_mapping,
+    'consolidation_memory': bench_consolidation_memory,
+    'compact_storage': bench_compact_storage,
+    'dedupe': bench_dedupe,
+    'fuzzy_dedupe': bench_fuzzy_dedupe,
+    'field_normalization': bench_field_normalization,
+    'column_profile': bench_column_profile,
+    'approximate_stats': bench_approximate_stats,
+    'shadow_columns': bench_shadow_columns,
+    'trigram_filter': bench_trigram_filter,
+}
+
+
+def main():
+    names = sys.argv[1:] or list(BENCHMARKS)
+    unknown = [name for name in names if name not in BENCHMARKS]
+    if unknown:
+        print(f"❌ Unknown benchmark(s): {unknown}. Available: {list(BENCHMARKS)}")
+        return False
+
+    for name in names:
+        print(f"\n⏱️  Benchmark: {name}")
+        print("=" * 50)
+        BENCHMARKS[name]()
+
+    return True
+
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
@@ -0,0 +1,329 @@
+from typing import Any, Dict, Hashable, Iterable, List, Optional, Tuple
+
+import re
+
+import numpy as np
+import pandas as pd
+
+from trigram_index import TrigramIndex
+
+# Most common values kept per column profile
+TOP_VALUES = 5
+# Columns longer than this are profiled with sketches instead of a full factorization;
+# the same as DataConsolidator's default out_of_core_rows, so on-disk masters use sketches
+APPROXIMATE_ROWS = 1_000_000
+# HyperLogLog registers are 2 ** HLL_PRECISION bytes; relative error 1.04 / sqrt(2 ** precision)
+HLL_PRECISION = 14
+# Counters kept by the frequent-items sketch
+FREQUENT_ITEM_COUNTERS = 1000
+# Rows hashed and counted at a time in approximate profiles
+SKETCH_CHUNK_ROWS = 100_000
+# Longer values are not parsed as numbers or dates
+MAX_NUMBER_LENGTH = 40
+
+# Values parsed as dates: 2021-03-04, 3/4/2021, 04.03.2021 13:45, ...
+_DATE_LIKE = re.compile(r'\d{1,4}[-/.]\d{1,2}[-/.]\d{1,4}([ T]\d{1,2}:\d{2}(:\d{2})?)?')
+
+
+class HyperLogLog:
+    """Distinct-count estimate from 64-bit hashes, in 2 ** precision one-byte registers"""
+
+    def __init__(self, precision: int = HLL_PRECISION):
+        self.precision = precision
+        self.registers = np.zeros(2 ** precision, dtype=np.uint8)
+
+    @property
+    def relative_error(self) -> float:
+        """Standard error of the estimate, relative to the true count"""
+        return 1.04 / np.sqrt(len(self.registers))
+
+    def add_hashes(self, hashes: np.ndarray):
+        remaining_bits = 64 - self.precision
+        buckets = (hashes >> np.uint64(remaining_bits)).astype(np.int64)
+        remainder = hashes & np.uint64((1 << remaining_bits) - 1)
+        # Rank of the first set bit of the remainder; frexp's exponent is its bit length
+        _, bit_length = np.frexp(remainder.astype(np.float64))
+        ranks = (remaining_bits - bit_length + 1).astype(np.uint8)
+        np.maximum.at(self.registers, buckets, ranks)
+
+    def estimate(self) -> int:
+        m = len(self.registers)
+        alpha = 0.7213 / (1 + 1.079 / m)
+        raw = alpha * m * m / np.sum(np.ldexp(1.0, -self.registers.astype(np.int64)))
+        empty_registers = int(np.count_nonzero(self.registers == 0))
+        if raw <= 2.5 * m and empty_registers:
+            # Linear counting is more accurate for small cardinalities
+            return int(round(m * np.log(m / empty_registers)))
+        return int(round(raw))
+
+
+class FrequentItems:
+    """Mergeable Misra-Gries summary (the dual of space-saving) of the most common values
+
+    Counts are lower bounds: each is at most error below the true count, and
+    error never exceeds rows seen / (capacity + 1).
+    """
+
+    def __init__(self, capacity: int = FREQUENT_ITEM_COUNTERS):
+        self.capacity = capacity
+        self.counts = pd.Series(dtype='int64')
+        self.error = 0
+
+    def _shrink(self, counts: pd.Series) -> pd.Series:
+        """Keep at most capacity counters by subtracting the (capacity + 1)-th largest count"""
+        if len(counts) <= self.capacity:
+            return counts
+        largest = counts.nlargest(self.capacity + 1)
+        cutoff = int(largest.iloc[-1])
+        self.error += cutoff
+        largest = largest - cutoff
+        return largest[largest > 0]
+
+    def add_counts(self, values: np.ndarray, counts: np.ndarray):
+        """Merge the exact counts of a batch's distinct values into the summary"""
+        if len(values) > self.capacity:
+            # Summarize the batch first, so the merge only aligns 2 * capacity counters
+            keep = np.argpartition(-counts, self.capacity)[:self.capacity + 1]
+            values, counts = values[keep], counts[keep]
+        batch = self._shrink(pd.Series(counts, index=values))
+        self.counts = self._shrink(self.counts.add(batch, fill_value=0).astype('int64'))
+
+    def top(self, n: int) -> pd.Series:
+        return self.counts.sort_values(ascending=False, kind='stable').head(n)
+
+
+def _factorize(series: pd.Series) -> Tuple[pd.Series, np.ndarray, np.ndarray, np.ndarray]:
+    """Return (series, codes, distinct values, counts), with lists counted per item"""
+    try:
+        codes, uniques = pd.factorize(series, use_na_sentinel=False)
+    except TypeError:
+        series = series.explode()
+        codes, uniques = pd.factorize(series, use_na_sentinel=False)
+    uniques = np.asarray(uniques, dtype=object)
+    return series, codes, uniques, np.bincount(codes, minlength=len(uniques))
+
+
+def _describe_distinct(uniques: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Non-empty flags and parsed numbers (NaN where unparseable) of distinct values"""
+    values = pd.Series(uniques, dtype=object).astype(str)
+    lengths = values.str.len()
+    # Same as strip() != '' without building stripped copies of long text
+    non_empty = ((lengths > 0) & ~values.str.isspace()).to_numpy()
+    # Long text (descriptions, URLs) is never a number; skip parsing it
+    candidates = (lengths <= MAX_NUMBER_LENGTH).to_numpy() & non_empty
+    numbers = np.full(len(uniques), np.nan)
+    if candidates.any():
+        numbers[candidates] = pd.to_numeric(
+            pd.Series(uniques[candidates], dtype=object), errors='coerce'
+        ).to_numpy(dtype=float)
+    return non_empty, numbers
+
+
+def _parse_numbers(uniques: np.ndarray) -> np.ndarray:
+    return _describe_distinct(uniques)[1]
+
+
+def _parse_dates(uniques: np.ndarray) -> np.ndarray:
+    values = pd.Series(uniques, dtype=object).astype(str).str.strip()
+    # Only date-shaped values are handed to the (slow, per-value) date parser
+    candidates = ((values.str.len() <= MAX_NUMBER_LENGTH) & values.str.fullmatch(_DATE_LIKE)).to_numpy()
+    dates = np.full(len(uniques), np.datetime64('NaT'), dtype='datetime64[ns]')
+    if candidates.any():
+        dates[candidates] = pd.to_datetime(values[candidates], errors='coerce', format='mixed').to_numpy()
+    return dates
+
+
+# Parser of distinct values and its missing value, by shadow kind
+_SHADOW_PARSERS = {
+    'numeric': (_parse_numbers, np.nan),
+    'date': (_parse_dates, np.datetime64('NaT', 'ns')),
+}
+
+
+class ShadowColumn:
+    """A column parsed as 'numeric' (float, NaN) or 'date' (datetime64, NaT), once per distinct value
+
+    values holds the parsed column. lookup() parses any other column through the
+    same table of distinct values, so a filtered or re-ordered copy is parsed by
+    value and can never be misaligned with the column it came from.
+    """
+
+    def __init__(self, series: pd.Series, kind: str = 'numeric'):
+        self.kind = kind
+        self.parse, self.missing = _SHADOW_PARSERS[kind]
+        exploded, codes, uniques, _ = _factorize(series)
+        if len(exploded) != len(series):
+            # Lists of merged sources are neither numbers nor dates
+            uniques, codes = np.array([], dtype=object), None
+        self.distinct = pd.Index(uniques, dtype=object)
+        self.parsed = self.parse(uniques)
+        if codes is None:
+            self.values = pd.Series(self.missing, index=series.index, dtype=self.parsed.dtype)
+        else:
+            self.values = pd.Series(self.parsed[codes], index=series.index)
+
+    def lookup(self, series: pd.Series) -> pd.Series:
+        """Parsed values of a column, parsing only values missing from the table"""
+        try:
+            positions = self.distinct.get_indexer(series)
+        except TypeError:
+            return pd.Series(self.missing, index=series.index, dtype=self.parsed.dtype)
+
+        parsed = np.full(len(series), self.missing, dtype=self.parsed.dtype)
+        known = positions >= 0
+        parsed[known] = self.parsed[positions[known]]
+        if not known.all():
+            parsed[~known] = ShadowColumn(series[~known], self.kind).values.to_numpy()
+        return pd.Series(parsed, index=series.index)
+
+
+def numeric_shadow(series: pd.Series) -> pd.Series:
+    """Parsed numbers of a column (NaN where unparseable), parsing each distinct value once"""
+    return ShadowColumn(series, 'numeric').values
+
+
+def date_shadow(series: pd.Series) -> pd.Series:
+    """Parsed dates of a column (NaT where not a date), parsing each distinct value once"""
+    return ShadowColumn(series, 'date').values
+
+
+def _numeric_stats(numeric_data: pd.Series) -> Dict[str, float]:
+    return {
+        'mean': numeric_data.mean(),
+        'median': numeric_data.median(),
+        'min': numeric_data.min(),
+        'max': numeric_data.max(),
+        'std': numeric_data.std()
+    }
+
+
+def sketch_profile(chunks: Iterable[pd.Series], data_type: str = 'object') -> Dict[str, Any]:
+    """Profile a column read chunk by chunk with bounded memory
+
+    Non-empty counts and numeric statistics are exact; the distinct count is a
+    HyperLogLog estimate and the most common values come from a frequent-items
+    sketch, with their error bounds under 'approximate'.
+    """
+    distinct = HyperLogLog()
+    frequent = FrequentItems()
+    total_values = 0
+    non_empty_values = 0
+    numeric_parts = []
+
+    for chunk in chunks:
+        chunk, _, uniques, counts = _factorize(chunk)
+        total_values += len(chunk)
+
+        # Everything below works on the chunk's distinct values and their counts
+        present = ~pd.isna(uniques)
+        non_empty, numbers = _describe_distinct(uniques)
+        non_empty_values += int(counts[non_empty].sum())
+        distinct.add_hashes(pd.util.hash_array(uniques[present]))
+        frequent.add_counts(uniques[present], counts[present])
+        parsed = ~np.isnan(numbers)
+        numeric_parts.append(np.repeat(numbers[parsed], counts[parsed]))
+
+    profile = {
+        'total_values': total_values,
+        'non_empty_values': non_empty_values,
+        'unique_values': distinct.estimate(),
+        'most_common': frequent.top(TOP_VALUES).to_dict(),
+        'data_type': data_type,
+        'approximate': {
+            'unique_values_relative_error': distinct.relative_error,
+            'most_common_max_undercount': frequent.error
+        }
+    }
+
+    numeric_data = pd.Series(np.concatenate(numeric_parts) if numeric_parts else np.array([], dtype=float))
+    if not numeric_data.empty:
+        profile['numeric_stats'] = _numeric_stats(numeric_data)
+    return profile
+
+
+def _approximate_profile(series: pd.Series) -> Dict[str, Any]:
+    """Sketch profile of an in-memory column, SKETCH_CHUNK_ROWS rows at a time"""
+    chunks = (series.iloc[start:start + SKETCH_CHUNK_ROWS] for start in range(0, len(series), SKETCH_CHUNK_ROWS))
+    return sketch_profile(chunks, str(series.dtype))
+
+
+def profile_column(series: pd.Series, approximate: bool = False) -> Dict[str, Any]:
+    """Profile one master sheet column from a single factorization
+
+    Non-empty, distinct and most common counts and numeric statistics are all
+    derived from the distinct values and their counts, so string stripping and
+    numeric parsing run once per distinct value rather than once per row.
+    Columns of lists (merged provenance) are profiled per list item. With
+    approximate=True, string columns are profiled with sketches instead of a
+    hash table of every distinct value; categoricals are already compact.
+    """
+    if approximate and not isinstance(series.dtype, pd.CategoricalDtype):
+        return _approximate_profile(series)
+
+    series, codes, uniques, counts = _factorize(series)
+    non_empty, numbers = _describe_distinct(uniques)
+    missing = pd.isna(uniques)
+
+    # Stable sort: equally common values are listed in order of first appearance
+    order = np.argsort(-counts, kind='stable')
+    order = order[~missing[order]][:TOP_VALUES]
+
+    profile = {
+        'total_values': len(series),
+        'non_empty_values': int(counts[non_empty].sum()),
+        'unique_values': int((~missing).sum()),
+        'most_common': dict(zip(uniques[order].tolist(), counts[order].tolist())),
+        'data_type': str(series.dtype)
+    }
+
+    if not np.isnan(numbers).all():
+        # Gathering through the codes keeps row order, so results match coercing every row
+        profile['numeric_stats'] = _numeric_stats(pd.Series(numbers[codes]))
+    return profile
+
+
+class ColumnProfiler:
+    """Column profiles, typed shadow columns and trigram indexes of the master sheet
+
+    All are built lazily and cached until the master's version token changes.
+    Sheets with more than approximate_rows rows get approximate profiles.
+    """
+
+    def __init__(self, approximate_rows: int = APPROXIMATE_ROWS):
+        self.approximate_rows = approximate_rows
+        self.version: Optional[Hashable] = None
+        self.profiles: Dict[str, Dict[str, Any]] = {}
+        self.shadows: Dict[Tuple[str, str], ShadowColumn] = {}
+        self.text_indexes: Dict[str, TrigramIndex] = {}
+
+    def _check_version(self, version: Hashable):
+        if version != self.version:
+            self.version = version
+            self.profiles = {}
+            self.shadows = {}
+            self.text_indexes = {}
+
+    def get_shadow(self, df: pd.DataFrame, version: Hashable, column: str, kind: str = 'numeric') -> ShadowColumn:
+        """Column parsed as 'numeric' or 'date'; see ShadowColumn"""
+        self._check_version(version)
+        if (column, kind) not in self.shadows:
+            self.shadows[(column, kind)] = ShadowColumn(df[column], kind)
+        return self.shadows[(column, kind)]
+
+    def get_text_index(self, df: pd.DataFrame, version: Hashable, column: str) -> TrigramIndex:
+        """Trigram index of a column's lowercased values, for case-insensitive contains filters"""
+        self._check_version(version)
+        if column not in self.text_indexes:
+            self.text_indexes[column] = TrigramIndex(df[column])
+        return self.text_indexes[column]
+
+    def get_profiles(self, df: pd.DataFrame, version: Hashable,
+                     columns: Optional[List[str]] = None) -> Dict[str, Dict[str, Any]]:
+        """Profiles of the given columns (all by default), computing only missing ones"""
+        self._check_version(version)
+
+        for column in (df.columns if columns is None else columns):
+            if column not in self.profiles and column in df.columns:
+                self.profiles[column] = profile_column(df[column], len(df) > self.approximate_rows)
+        return {column: self.profiles[column] for column in (df.columns if columns is None else columns)
+                if column in self.profiles}
@@ -0,0 +1,83 @@
+import re
+from typing import Dict, List, Tuple
+
+import numpy as np
+import pandas as pd
+
+# Values sampled per source column; classification cost does not grow with row count
+SAMPLE_SIZE = 200
+
+# (pattern, candidate standard headers) in priority order. Each sampled value is
+# counted for the first pattern it matches, so a LinkedIn URL is not also a website.
+CONTENT_PATTERNS: List[Tuple[re.Pattern, List[str]]] = [
+    (re.compile(r'[^@\s]+@[^@\s]+\.[a-z]{2,}', re.IGNORECASE), ['email']),
+    (re.compile(r'(https?://)?([a-z]{2,3}\.)?linkedin\.com/(company|school)/\S+', re.IGNORECASE),
+     ['organization_linkedin_url']),
+    (re.compile(r'(https?://)?([a-z]{2,3}\.)?linkedin\.com/(in|pub)/\S+', re.IGNORECASE),
+     ['linkedin_url', 'account_linkedin']),
+    (re.compile(r'(https?://)?(www\.|m\.)?(facebook|fb)\.com/\S+', re.IGNORECASE), ['facebook_url']),
+    (re.compile(r'(https?://)?(www\.|mobile\.)?(twitter|x)\.com/\S+', re.IGNORECASE), ['twitter_url']),
+    (re.compile(r'(https?://)?(www\.)?[a-z0-9-]+(\.[a-z0-9-]+)*\.[a-z]{2,}(:\d+)?(/\S*)?', re.IGNORECASE),
+     ['website', 'organization_name_url']),
+    # Years, also as written back by Excel's float parsing ("1998.0")
+    (re.compile(r'(1[89]|20)\d{2}(\.0)?'), ['founded_year']),
+    # "$1M-$10M", "10-50 million", "<$1M", "$1B+", "Under 500K"
+    (re.compile(r'(<|>|under|over|less than|more than)?\s*\$?\s*\d+(\.\d+)?\s*([kmb]|thousand|million|billion)?'
+                r'\s*(-|–|to)\s*\$?\s*\d+(\.\d+)?\s*([kmb]|thousand|million|billion)\+?'
+                r'|(<|>|under|over|less than|more than)?\s*\$\s*\d+(\.\d+)?\s*([kmb]|thousand|million|billion)\+?'
+                r'|(<|>|under|over|less than|more than)\s*\$?\s*\d+(\.\d+)?\s*([kmb]|thousand|million|billion)',
+                re.IGNORECASE), ['estimated_revenue_range']),
+    # Phone numbers: digits with the usual separators; digit counts are checked separately
+    (re.compile(r'\+?[\d\s().\-/]{7,25}(\s*(x|ext\.?)\s*\d{1,5})?', re.IGNORECASE),
+     ['phone_numbers', 'company_phone']),
+]
+
+_PHONE_STANDARDS = ['phone_numbers', 'company_phone']
+_NON_DIGIT = re.compile(r'\D')
+_PHONE_SEPARATOR = re.compile(r'[\s().\-/+]')
+
+
+def sample_values(series: pd.Series, sample_size: int = SAMPLE_SIZE) -> pd.Series:
+    """Return up to sample_size stripped, non-empty values spread evenly over a column"""
+    if len(series) > sample_size * 4:
+        # Evenly spaced positions cover the whole column at a fixed cost
+        positions = np.linspace(0, len(series) - 1, sample_size * 4).astype(int)
+        series = series.iloc[positions]
+
+    values = series.dropna().astype(str).str.strip()
+    values = values[values != '']
+    if len(values) > sample_size:
+        positions = np.linspace(0, len(values) - 1, sample_size).astype(int)
+        values = values.iloc[positions]
+    return values.reset_index(drop=True)
+
+
+def score_column(series: pd.Series, sample_size: int = SAMPLE_SIZE) -> Dict[str, int]:
+    """Score candidate standard headers from the values of one source column
+
+    The score of a candidate is the share (0-100) of sampled non-empty values that
+    match its content pattern. Returns {} for columns without sampled values.
+    """
+    values = sample_values(series, sample_size)
+    if values.empty:
+        return {}
+
+    unclaimed = pd.Series(True, index=values.index)
+    scores = {}
+    for pattern, standard_headers in CONTENT_PATTERNS:
+        matched = unclaimed & values.str.fullmatch(pattern)
+        if standard_headers == _PHONE_STANDARDS:
+            # Years, counts and IDs are digits too: require a phone-length number
+            # that is either formatted or long enough to carry an area code
+            digit_count = values.str.replace(_NON_DIGIT, '', regex=True).str.len()
+            formatted = values.str.contains(_PHONE_SEPARATOR)
+            matched &= digit_count.between(7, 15) & (formatted | (digit_count >= 10))
+
+        match_count = int(matched.sum())
+        if match_count:
+            unclaimed &= ~matched
+            score = round(100 * match_count / len(values))
+            for standard_header in standard_headers:
+                scores.setdefault(standard_header, score)
+
+    return scores
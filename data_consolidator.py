@@ -1,31 +1,94 @@
+import io
+import os
+import tempfile
+import numpy as np
 import pandas as pd
-from typing import Dict, List, Any, Optional
+from typing import BinaryIO, Dict, Iterable, List, Any, Optional, Tuple, Union
 from header_mapper import HeaderMapper
 from spreadsheet_processor import SpreadsheetProcessor
+from parse_cache import ParseCache
+from mapping_store import MappingStore
+from content_classifier import score_column
+from master_store import EXCEL_MAX_ROWS, MasterStore
+from deduplicator import Deduplicator, is_list_column
+from column_profile import APPROXIMATE_ROWS, ColumnProfiler
+from trigram_index import is_searchable
 import streamlit as st
 
 class DataConsolidator:
-    def __init__(self):
-        self.header_mapper = HeaderMapper()
-        self.processor = SpreadsheetProcessor()
+    def __init__(self, parse_cache: Optional[ParseCache] = None, 
+                 mapping_store: Optional[MappingStore] = None, compact_storage: bool = False,
+                 master_store: Optional[MasterStore] = None, out_of_core_rows: int = 1_000_000,
+                 normalize_fields: bool = False, approximate_stats_rows: int = APPROXIMATE_ROWS):
+        self.header_mapper = HeaderMapper(mapping_store)
+        self.processor = SpreadsheetProcessor(parse_cache, normalize_fields)
+        self.deduplicator = Deduplicator()
+        # Above approximate_stats_rows rows, distinct counts and top values are estimated
+        self.profiler = ColumnProfiler(approximate_stats_rows)
+        # Bumped whenever master_data changes; cached column profiles are keyed on it
+        self.master_version = 0
         self.master_data = pd.DataFrame()
         self.processed_data = {}
         self.current_mapping = {}
+        # Mappings proposed by auto-matching; only entries the user changes are persisted
+        self.auto_mappings = {}
+        self.uploaded_files = []
+        self.pending_uploads = []
+        self.max_workers = 1
+        self.compact_storage = compact_storage
+        self.summary = {}
+        # Mapping master_data was built with; None when it no longer matches processed_data
+        self.master_mapping = None
+        # Uploads of at least out_of_core_rows rows are consolidated into master_store,
+        # and master_data then only holds a preview
+        self.master_store = master_store
+        self.out_of_core_rows = out_of_core_rows
+        self.out_of_core = False
+        self.estimated_rows = 0
         
-    def process_files(self, uploaded_files: List[Any]) -> Dict[str, Any]:
-        """Process uploaded files and return processing results"""
+    @property
+    def master_data(self) -> pd.DataFrame:
+        return self._master_data
+        
+    @master_data.setter
+    def master_data(self, master_data: pd.DataFrame):
+        self._master_data = master_data
+        self.master_version += 1
+        
+    def get_column_profiles(self, columns: Optional[List[str]] = None) -> Dict[str, Dict[str, Any]]:
+        """Cached profiles (counts, top values, numeric stats) of in-memory master columns"""
+        return self.profiler.get_profiles(self.master_data, self.master_version, columns)
+        
+    def process_files(self, uploaded_files: List[Any], max_workers: int = 1, 
+                      headers_only: bool = False) -> Dict[str, Any]:
+        """Process uploaded files and return processing results
+        
+        With headers_only=True only the header row and a small sample of each
+        sheet are read here; the full files are loaded later by consolidate_data.
+        """
         try:
-            # Process all uploaded files
-            self.processed_data = self.processor.process_uploaded_files(uploaded_files)
+            self.max_workers = max_workers
+            self.uploaded_files = list(uploaded_files)
+            self.master_mapping = None
+            
+            if headers_only:
+                self.processed_data = self.processor.scan_uploaded_files(uploaded_files)
+                self.pending_uploads = list(uploaded_files)
+            else:
+                # Process all uploaded files
+                self.processed_data = self.processor.process_uploaded_files(uploaded_files, max_workers)
+                self.pending_uploads = []
             
             # Get all unique headers
             all_headers = self.processor.get_all_headers(self.processed_data)
+            auto_mappings, mapping_suggestions = self._match_headers(self.processed_data, all_headers)
+            self.auto_mappings = dict(auto_mappings)
             
-            # Generate automatic mappings
-            auto_mappings = self.header_mapper.map_headers(all_headers)
-            
-            # Get mapping suggestions for user review
-            mapping_suggestions = self.header_mapper.get_mapping_suggestions(all_headers)
+            self.estimated_rows = sum(
+                sheet.attrs.get('estimated_rows', len(sheet))
+                for sheets in self.processed_data.values() for sheet in sheets
+            )
+            self.out_of_core = False
             
             return {
                 'success': True,
@@ -33,7 +96,8 @@ class DataConsolidator:
                 'auto_mappings': auto_mappings,
                 'mapping_suggestions': mapping_suggestions,
                 'file_count': len(self.processed_data),
-                'total_sheets': sum(len(sheets) for sheets in self.processed_data.values())
+                'total_sheets': sum(len(sheets) for sheets in self.processed_data.values()),
+                'estimated_rows': self.estimated_rows
             }
             
         except Exception as e:
@@ -42,14 +106,69 @@ class DataConsolidator:
                 'error': str(e)
             }
             
-    def update_header_mapping(self, header_mapping: Dict[str, str]):
-        """Update the header mapping configuration"""
+    def _match_headers(self, processed_data: Dict[str, List[pd.DataFrame]], 
+                       headers: List[str]) -> Tuple[Dict[str, str], Dict[str, List[Tuple[str, int]]]]:
+        """Auto-map headers of the processed sheets and collect suggestions for review"""
+        # Sheets matching a saved vendor template are mapped without fuzzy matching
+        wanted_headers = set(headers)
+        template_mappings = {}
+        for sheets in processed_data.values():
+            for sheet in sheets:
+                sheet_headers = self.processor.get_sheet_headers(sheet)
+                for header, standard in self.header_mapper.apply_template(sheet_headers).items():
+                    if header in wanted_headers:
+                        template_mappings.setdefault(header, standard)
+        
+        # Generate automatic mappings and suggestions for user review in one pass
+        unmatched_headers = [header for header in headers if header not in template_mappings]
+        auto_mappings, mapping_suggestions = self.header_mapper.match_headers(
+            unmatched_headers, 
+            content_scores=self._score_column_contents(processed_data, set(unmatched_headers))
+        )
+        
+        for header, standard in template_mappings.items():
+            auto_mappings[header] = standard
+            # Cheap, pruned alternatives so the template choice can still be changed
+            alternatives = self.header_mapper.get_top_matches(header, k=4, threshold=60)
+            mapping_suggestions[header] = ([(standard, 100)] if standard else []) + alternatives
+            
+        return {header: auto_mappings[header] for header in headers}, mapping_suggestions
+        
+    def _score_column_contents(self, processed_data: Dict[str, List[pd.DataFrame]], 
+                               headers: set) -> Dict[str, Dict[str, int]]:
+        """Classify a bounded sample of each header's values, using the first sheet that has any"""
+        content_scores = {}
+        for sheets in processed_data.values():
+            for sheet in sheets:
+                for position, header in enumerate(sheet.columns):
+                    if header in headers and not content_scores.get(header):
+                        content_scores[header] = score_column(sheet.iloc[:, position])
+                        
+        return content_scores
+        
+    def update_header_mapping(self, header_mapping: Dict[str, str], confirmed_headers: Iterable[str] = ()):
+        """Update the header mapping configuration
+        
+        Entries that differ from the auto-mapping, and those of confirmed_headers,
+        are learned for future sessions; untouched auto-mapped guesses are not.
+        """
         self.current_mapping = header_mapping
+        confirmed_headers = set(confirmed_headers)
         
         # Add custom mappings to the header mapper
+        confirmed_mappings = {}
         for original, standard in header_mapping.items():
-            if standard != original:
+            changed = standard != self.auto_mappings.get(original, original)
+            if standard != original and (changed or original in confirmed_headers):
                 self.header_mapper.add_custom_mapping(original, standard)
+                confirmed_mappings[original] = standard
+                
+        # Remember them, and each sheet's confirmed entries as a template, for future sessions
+        self.header_mapper.save_confirmed_mappings(confirmed_mappings)
+        self.header_mapper.save_templates([
+            (self.processor.get_sheet_headers(sheet), confirmed_mappings)
+            for sheets in self.processed_data.values() for sheet in sheets
+        ])
                 
     def consolidate_data(self) -> Dict[str, Any]:
         """Consolidate all processed data using current header mapping"""
@@ -60,19 +179,275 @@ class DataConsolidator:
                     'error': 'No data processed or mapping configured'
                 }
                 
+            if self.master_store is not None and self.estimated_rows >= self.out_of_core_rows:
+                return self._consolidate_to_store()
+            self.out_of_core = False
+                
+            # After a mapping edit, rebuild only the master columns it affects
+            if self.master_mapping is not None and not self.master_data.empty:
+                return self._update_mapped_columns()
+                
+            # Load the full files deferred by a header-only scan
+            if self.pending_uploads:
+                # Only parse the source columns the mapping sends to a required header
+                all_headers = self.processor.get_all_headers(self.processed_data)
+                usecols = self.processor.get_mapped_columns(all_headers, self.current_mapping)
+                self.processed_data = self.processor.process_uploaded_files(
+                    self.pending_uploads, self.max_workers, usecols
+                )
+                self.pending_uploads = []
+            else:
+                self._load_mapped_columns()
+                
             # Consolidate data
             self.master_data = self.processor.consolidate_data(
                 self.processed_data, 
-                self.current_mapping
+                self.current_mapping,
+                compact=self.compact_storage
             )
             
+            if 'error' not in self.master_data.columns:
+                self.master_mapping = dict(self.current_mapping)
+            
             # Get summary statistics
-            summary = self.processor.get_data_summary(self.master_data)
+            self.summary = self.processor.get_data_summary(self.master_data, self.get_column_profiles())
+            
+            return {
+                'success': True,
+                'data': self.master_data,
+                'summary': self.summary
+            }
+            
+        except Exception as e:
+            return {
+                'success': False,
+                'error': str(e)
+            }
+            
+    def _consolidate_to_store(self) -> Dict[str, Any]:
+        """Stream aligned chunks of every upload into the on-disk master store"""
+        self.master_store.reset(self.processor.get_master_headers())
+        self.master_store.write_chunks(self.processor.iter_aligned_chunks(
+            self.uploaded_files, self.current_mapping, self.master_store.chunk_rows
+        ))
+        
+        self.out_of_core = True
+        self.master_mapping = None
+        self.master_data = self.master_store.preview()
+        self.summary = self.master_store.get_summary()
+        
+        return {
+            'success': True,
+            'data': self.master_data,
+            'summary': self.summary,
+            'out_of_core': True
+        }
+        
+    def _update_mapped_columns(self) -> Dict[str, Any]:
+        """Recompute the master columns fed by mapping entries changed since the last build"""
+        all_headers = self.processor.get_all_headers(self.processed_data)
+        affected_headers = self.processor.get_affected_headers(
+            all_headers, self.master_mapping, self.current_mapping
+        )
+        
+        if affected_headers:
+            self._load_mapped_columns()
+            self.processor.update_master_columns(
+                self.master_data, self.processed_data, self.current_mapping, 
+                affected_headers, compact=self.compact_storage
+            )
+            # Columns were replaced in place
+            self.master_version += 1
+            column_info = self.processor.get_data_summary(
+                self.master_data[sorted(affected_headers)], self.get_column_profiles(sorted(affected_headers))
+            )
+            self.summary['column_info'].update(column_info.get('column_info', {}))
+            
+        self.master_mapping = dict(self.current_mapping)
+        
+        return {
+            'success': True,
+            'data': self.master_data,
+            'summary': self.summary,
+            'updated_columns': sorted(affected_headers)
+        }
+        
+    def _load_mapped_columns(self):
+        """Re-read the uploads if sheets read with only the previously mapped columns lack newly mapped ones"""
+        all_headers = self.processor.get_all_headers(self.processed_data)
+        mapped_columns = self.processor.get_mapped_columns(all_headers, self.current_mapping)
+        missing_columns = any(
+            header in mapped_columns and header not in sheet.columns
+            for sheets in self.processed_data.values() for sheet in sheets
+            for header in self.processor.get_sheet_headers(sheet)
+        )
+        if missing_columns:
+            self.processed_data = self.processor.process_uploaded_files(
+                self.uploaded_files, self.max_workers, mapped_columns
+            )
+            
+    def append_files(self, uploaded_files: List[Any]) -> Dict[str, Any]:
+        """Consolidate additional uploads onto the existing master sheet
+        
+        Only the new files are parsed, mapped, aligned and summarized; the result
+        is the same as re-processing and consolidating every file. Headers the
+        current mapping does not cover are auto-mapped as in process_files, and
+        files whose name was already consolidated are skipped.
+        """
+        try:
+            if self.out_of_core:
+                return self._append_to_store(uploaded_files)
+                
+            if self.master_data.empty or not self.current_mapping or self.pending_uploads:
+                return {
+                    'success': False,
+                    'error': 'No consolidated data to append to'
+                }
+                
+            new_uploads = [f for f in uploaded_files if f.name not in self.processed_data]
+            skipped_files = [f.name for f in uploaded_files if f.name in self.processed_data]
+            # Scan headers first, as process_files(headers_only=True) does, so only
+            # the mapped columns of the new files are parsed
+            scanned_data = self.processor.scan_uploaded_files(new_uploads)
+            new_headers, auto_mappings, mapping_suggestions = self._map_new_headers(scanned_data)
+            usecols = self.processor.get_mapped_columns(
+                self.processor.get_all_headers(scanned_data), self.current_mapping
+            )
+            new_data = self.processor.process_uploaded_files(new_uploads, self.max_workers, usecols)
+                
+            new_master = self.processor.consolidate_data(
+                new_data, self.current_mapping, compact=self.compact_storage
+            )
+            new_summary = self.processor.get_data_summary(new_master)
+            
+            self.master_data = self.processor.append_master(self.master_data, new_master)
+            self.summary = self.processor.merge_data_summary(self.summary, new_summary, self.master_data)
+            self.processed_data.update(new_data)
+            self.uploaded_files.extend(new_uploads)
+            if self.master_mapping is not None:
+                # Still None after deduplication: rows no longer line up with processed_data
+                self.master_mapping = dict(self.current_mapping)
+            
+            return {
+                'success': True,
+                'data': self.master_data,
+                'summary': self.summary,
+                'appended_rows': len(new_master),
+                'new_headers': new_headers,
+                'auto_mappings': auto_mappings,
+                'mapping_suggestions': mapping_suggestions,
+                'skipped_files': skipped_files
+            }
+            
+        except Exception as e:
+            return {
+                'success': False,
+                'error': str(e)
+            }
+            
+    def _map_new_headers(self, new_data: Dict[str, List[pd.DataFrame]]) -> Tuple[List[str], Dict[str, str], Dict[str, List[Tuple[str, int]]]]:
+        """Auto-map headers that only appear in appended files and add them to current_mapping"""
+        new_headers = [
+            header for header in self.processor.get_all_headers(new_data)
+            if header not in self.current_mapping
+        ]
+        auto_mappings, mapping_suggestions = {}, {}
+        if new_headers:
+            auto_mappings, mapping_suggestions = self._match_headers(new_data, new_headers)
+            self.current_mapping = {**self.current_mapping, **auto_mappings}
+            self.auto_mappings.update(auto_mappings)
+        return new_headers, auto_mappings, mapping_suggestions
+        
+    def _append_to_store(self, uploaded_files: List[Any]) -> Dict[str, Any]:
+        """Out-of-core counterpart of append_files: stream only the new uploads into the store"""
+        new_uploads = [f for f in uploaded_files if f.name not in self.processed_data]
+        skipped_files = [f.name for f in uploaded_files if f.name in self.processed_data]
+        new_data = self.processor.scan_uploaded_files(new_uploads)
+        new_headers, auto_mappings, mapping_suggestions = self._map_new_headers(new_data)
+            
+        appended_rows = self.master_store.write_chunks(self.processor.iter_aligned_chunks(
+            new_uploads, self.current_mapping, self.master_store.chunk_rows
+        ))
+        
+        self.processed_data.update(new_data)
+        self.uploaded_files.extend(new_uploads)
+        if self.pending_uploads:
+            self.pending_uploads.extend(new_uploads)
+        self.master_data = self.master_store.preview()
+        self.summary = self.master_store.get_summary()
+        
+        return {
+            'success': True,
+            'data': self.master_data,
+            'summary': self.summary,
+            'appended_rows': appended_rows,
+            'new_headers': new_headers,
+            'auto_mappings': auto_mappings,
+            'mapping_suggestions': mapping_suggestions,
+            'skipped_files': skipped_files
+        }
+        
+    def deduplicate_data(self, fuzzy: bool = False, merge: bool = False) -> Dict[str, Any]:
+        """Collapse duplicate contacts in the master data
+        
+        Each cluster keeps its first row, or with merge=True a golden record built
+        with the deduplicator's survivorship rules, where source_file and
+        source_sheet list the sources of each record.
+        """
+        try:
+            if self.master_data.empty:
+                return {
+                    'success': False,
+                    'error': 'No consolidated data to deduplicate'
+                }
+            if self.out_of_core:
+                return {
+                    'success': False,
+                    'error': 'Deduplication needs the master data in memory'
+                }
+                
+            master_data, report = self.deduplicator.deduplicate(self.master_data, fuzzy=fuzzy, merge=merge)
+            if merge and self.compact_storage:
+                # Golden records come back as object strings; encode them like the rest of the master
+                for column in master_data.columns:
+                    if self.deduplicator.survivorship_rules.get(column) != 'list':
+                        master_data[column] = self.processor.compact_column(master_data[column].to_numpy())
+            self.master_data = master_data
+            
+            # Rows no longer line up with processed_data, so mapping edits rebuild
+            self.master_mapping = None
+            self.summary = self.processor.get_data_summary(self.master_data, self.get_column_profiles())
             
             return {
                 'success': True,
                 'data': self.master_data,
-                'summary': summary
+                'summary': self.summary,
+                'duplicates_removed': len(report) - report['kept_row'].nunique(),
+                'report': report
+            }
+            
+        except Exception as e:
+            return {
+                'success': False,
+                'error': str(e)
+            }
+            
+    def consolidate_to_csv(self, output: Any, chunksize: int = 100_000) -> Dict[str, Any]:
+        """Stream the consolidated master sheet to a CSV file without holding it in memory"""
+        try:
+            if not self.uploaded_files or not self.current_mapping:
+                return {
+                    'success': False,
+                    'error': 'No data processed or mapping configured'
+                }
+                
+            rows_written = self.processor.consolidate_csv_stream(
+                self.uploaded_files, self.current_mapping, output, chunksize
+            )
+            
+            return {
+                'success': True,
+                'rows': rows_written
             }
             
         except Exception as e:
@@ -83,10 +458,15 @@ class DataConsolidator:
             
     def filter_data(self, filters: Dict[str, Any]) -> pd.DataFrame:
         """Apply filters to the master data"""
+        if self.out_of_core:
+            # Bounded by the store's memory budget
+            return self.master_store.preview(filters)
+            
         if self.master_data.empty:
             return pd.DataFrame()
             
-        filtered_data = self.master_data.copy()
+        # Each filter selects a new frame; the master is only copied if none applies
+        filtered_data = self.master_data
         
         for column, filter_value in filters.items():
             if filter_value and column in filtered_data.columns:
@@ -96,11 +476,19 @@ class DataConsolidator:
                         col_series = filtered_data[column]
                         if isinstance(col_series, pd.DataFrame):
                             col_series = col_series.iloc[:, 0]
-                        filtered_data = filtered_data[
-                            col_series.astype(str).str.contains(
+                        if isinstance(col_series.dtype, pd.CategoricalDtype):
+                            # Match each distinct value once, then expand through the codes
+                            category_matches = col_series.cat.categories.astype(str).str.contains(
                                 filter_value, case=False, na=False
                             )
-                        ]
+                            matches = np.append(category_matches, False)[col_series.cat.codes]
+                        else:
+                            matches = self._indexed_contains(filtered_data, column, filter_value)
+                            if matches is None:
+                                matches = col_series.astype(str).str.contains(
+                                    filter_value, case=False, na=False
+                                )
+                        filtered_data = filtered_data[matches]
                     except Exception:
                         # Skip filter if it fails
                         continue
@@ -110,8 +498,40 @@ class DataConsolidator:
                         filtered_data[column].isin(filter_value)
                     ]
                     
+        if filtered_data is self.master_data:
+            return filtered_data.copy()
         return filtered_data
         
+    def _indexed_contains(self, data: pd.DataFrame, column: str, pattern: str) -> Optional[np.ndarray]:
+        """Case-insensitive contains mask of a master column from its trigram index, aligned with data
+        
+        Returns None when the pattern cannot use the index or data is not rows of the master.
+        """
+        if (not is_searchable(pattern) or column not in self.master_data.columns
+                or not self.master_data.index.is_unique):
+            return None
+        index = self.profiler.get_text_index(self.master_data, self.master_version, column)
+        matches = index.contains(pattern)
+        if matches is None or len(data) == len(self.master_data):
+            return matches
+        try:
+            return pd.Series(matches, index=self.master_data.index).loc[data.index].to_numpy()
+        except KeyError:
+            return None
+            
+    def _get_shadow(self, data: pd.DataFrame, column: str, kind: str) -> Optional[pd.Series]:
+        """Numeric or date values of data[column], parsed through the master's cached shadow
+        
+        Any frame can be passed: its values are looked up by value, not by row label.
+        Returns None out of core or when the master has no such column.
+        """
+        if self.out_of_core or column not in self.master_data.columns:
+            return None
+        shadow = self.profiler.get_shadow(self.master_data, self.master_version, column, kind)
+        if data is self.master_data:
+            return shadow.values
+        return shadow.lookup(data[column])
+            
     def sort_data(self, data: pd.DataFrame, sort_column: str, 
                   ascending: bool = True) -> pd.DataFrame:
         """Sort data by specified column"""
@@ -119,21 +539,49 @@ class DataConsolidator:
             return data
             
         try:
-            # Try to sort numerically first
-            numeric_data = pd.to_numeric(data[sort_column], errors='coerce')
+            # Try to sort numerically first, then as dates
+            numeric_data = self._get_shadow(data, sort_column, 'numeric')
+            if numeric_data is None:
+                numeric_data = pd.to_numeric(data[sort_column], errors='coerce')
             if not numeric_data.isna().all():
-                return data.sort_values(sort_column, ascending=ascending, 
-                                      key=lambda x: pd.to_numeric(x, errors='coerce'))
+                return data.sort_values(sort_column, ascending=ascending, key=lambda x: numeric_data)
+                
+            date_data = self._get_shadow(data, sort_column, 'date')
+            if date_data is not None and not date_data.isna().all():
+                return data.sort_values(sort_column, ascending=ascending, key=lambda x: date_data)
+            elif isinstance(data[sort_column].dtype, pd.CategoricalDtype):
+                # Categories are kept in order of appearance; sort them as strings
+                return data.sort_values(sort_column, ascending=ascending,
+                                      key=lambda x: x.cat.reorder_categories(sorted(x.cat.categories)))
             else:
                 # Sort as strings
                 return data.sort_values(sort_column, ascending=ascending)
         except:
             return data.sort_values(sort_column, ascending=ascending)
             
-    def export_data(self, data: pd.DataFrame, format: str = 'xlsx') -> bytes:
-        """Export data in specified format"""
+    def export_data(self, data: pd.DataFrame, format: str = 'xlsx', 
+                    filters: Optional[Dict[str, Any]] = None) -> Union[bytes, BinaryIO]:
+        """Export data in specified format
+        
+        Out of core, data is only a preview, so the rows matching filters are
+        exported from the master store to a temporary file, returned open for
+        reading instead of as bytes. Raises ValueError for xlsx exports larger
+        than an Excel worksheet.
+        """
+        if self.out_of_core:
+            return self._export_from_store(format, filters)
+            
+        if format == 'xlsx' and len(data) + 1 > EXCEL_MAX_ROWS:
+            raise ValueError(
+                f"{len(data):,} rows do not fit in an Excel worksheet ({EXCEL_MAX_ROWS - 1:,} at most); export as CSV"
+            )
+            
+        list_columns = [column for column in data.columns if is_list_column(data[column])]
+        if list_columns:
+            # Merged golden records list their sources; write them as one cell
+            data = data.assign(**{column: data[column].map('; '.join) for column in list_columns})
+            
         if format == 'xlsx':
-            import io
             output = io.BytesIO()
             with pd.ExcelWriter(output, engine='openpyxl') as writer:
                 data.to_excel(writer, index=False, sheet_name='Master_Sheet')
@@ -143,45 +591,50 @@ class DataConsolidator:
         else:
             raise ValueError(f"Unsupported export format: {format}")
             
+    def _export_from_store(self, format: str, filters: Optional[Dict[str, Any]]) -> BinaryIO:
+        """Export the filtered store to a temporary file and return it open at the start"""
+        handle, path = tempfile.mkstemp(suffix=f'.{format}')
+        os.close(handle)
+        try:
+            self.master_store.export(path, format, filters)
+            export = open(path, 'rb')
+        finally:
+            # The open file stays readable after its name is removed
+            os.unlink(path)
+        return export
+        
     def get_column_stats(self, column: str) -> Dict[str, Any]:
         """Get statistics for a specific column"""
+        if self.out_of_core:
+            return self.master_store.get_column_stats(column)
+            
         if self.master_data.empty or column not in self.master_data.columns:
             return {}
             
-        col_data = self.master_data[column]
-        
         try:
-            # Ensure we're working with a Series
-            if isinstance(col_data, pd.DataFrame):
-                col_data = col_data.iloc[:, 0]
-            
-            stats = {
-                'total_values': len(col_data),
-                'non_empty_values': col_data.astype(str).str.strip().ne('').sum(),
-                'unique_values': col_data.nunique(),
-                'most_common': col_data.value_counts().head(5).to_dict()
-            }
+            profile = self.get_column_profiles([column])[column]
         except Exception as e:
-            stats = {
-                'total_values': len(col_data) if hasattr(col_data, '__len__') else 0,
+            return {
+                'total_values': len(self.master_data),
                 'non_empty_values': 0,
                 'unique_values': 0,
                 'most_common': {},
                 'error': str(e)
             }
-        
-        # Try to get numeric stats
-        try:
-            numeric_data = pd.to_numeric(col_data, errors='coerce')
-            if not numeric_data.isna().all():
-                stats['numeric_stats'] = {
-                    'mean': numeric_data.mean(),
-                    'median': numeric_data.median(),
-                    'min': numeric_data.min(),
-                    'max': numeric_data.max(),
-                    'std': numeric_data.std()
-                }
-        except:
-            pass
             
-        return stats
\ No newline at end of file
+        return {key: value for key, value in profile.items() if key != 'data_type'}
+        
+    def get_value_counts(self, column: str) -> pd.Series:
+        """Count each value of a master sheet column, most common first"""
+        if self.out_of_core:
+            return self.master_store.value_counts(column)
+        values = self.master_data[column]
+        if values.dtype == object:
+            values = values.explode()
+        return values.value_counts()
+        
+    def get_numeric_values(self, column: str) -> pd.Series:
+        """Return the values of a master sheet column that parse as numbers"""
+        if self.out_of_core:
+            return self.master_store.numeric_values(column)
+        return self._get_shadow(self.master_data, column, 'numeric').dropna()
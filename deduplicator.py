@@ -0,0 +1,386 @@
+import re
+from itertools import chain
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+from fuzzywuzzy import fuzz
+
+# Minimum fuzz.ratio of both the names and the organizations of a fuzzy match
+FUZZY_THRESHOLD = 85
+# Sorted-neighbourhood window: each row is compared with the next WINDOW - 1 rows
+FUZZY_WINDOW = 10
+
+# Survivorship rule per master header when duplicates are merged into a golden
+# record; other headers keep their first non-empty value ('first'):
+#   'latest'         last non-empty value, later rows being the more recent uploads
+#   'most_complete'  value with the most letters and digits
+#   'union'          distinct comma/semicolon/pipe separated items, in order of appearance
+#   'list'           every value of a merged cluster, as a list (provenance)
+SURVIVORSHIP_RULES = {
+    'phone_numbers': 'most_complete',
+    'company_phone': 'most_complete',
+    'about': 'most_complete',
+    'description': 'most_complete',
+    'full_description': 'most_complete',
+    'headline': 'latest',
+    'title': 'latest',
+    'designation': 'latest',
+    'job_time_period': 'latest',
+    'skills': 'union',
+    'technologies': 'union',
+    'keywords': 'union',
+    'industries': 'union',
+    'source_file': 'list',
+    'source_sheet': 'list',
+}
+
+_WHITESPACE = re.compile(r'\s+')
+_URL_PREFIX = re.compile(r'^(https?://)?(www\.)?')
+_URL_SUFFIX = re.compile(r'/*([?#].*)?$')
+_NAME_PUNCTUATION = re.compile(r'[^\w\s]')
+_WORD_CHARACTER = re.compile(r'\w')
+_LIST_SEPARATOR = re.compile(r'\s*[,;|]\s*')
+_ORG_SUFFIX = re.compile(r'\b(inc|incorporated|llc|ltd|limited|corp|corporation|co|company|gmbh|plc|ag|sa)\b')
+
+
+def _map_categories(series: pd.Series, normalize: Callable[[pd.Series], pd.Series]) -> pd.Series:
+    """Apply a vectorized normalizer once per distinct value of a categorical column"""
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        categories = normalize(pd.Series(series.cat.categories.astype(str)))
+        return pd.Series(
+            np.append(categories.to_numpy(dtype=object), '')[series.cat.codes],
+            index=series.index
+        )
+    return normalize(series.astype(str))
+
+
+def _email_key(series: pd.Series) -> pd.Series:
+    """Dedupe key of email addresses: lowercased and trimmed"""
+    return _map_categories(series, lambda values: values.str.strip().str.lower())
+
+
+def _url_key(series: pd.Series) -> pd.Series:
+    """Dedupe key of profile URLs: lowercased, without scheme, 'www.', query string, fragment or trailing slash
+
+    Coarser than field_normalizer.normalize_url, which keeps non-tracking query
+    parameters and path case: two links to the same profile should collide here.
+    """
+    def normalize(values):
+        values = values.str.strip().str.lower()
+        values = values.str.replace(_URL_PREFIX, '', regex=True)
+        return values.str.replace(_URL_SUFFIX, '', regex=True)
+    return _map_categories(series, normalize)
+
+
+def _name_key(series: pd.Series) -> pd.Series:
+    """Dedupe key of names: lowercased, punctuation removed and whitespace collapsed"""
+    def normalize(values):
+        values = values.str.lower().str.replace(_NAME_PUNCTUATION, ' ', regex=True)
+        return values.str.replace(_WHITESPACE, ' ', regex=True).str.strip()
+    return _map_categories(series, normalize)
+
+
+def _group_lists(values: np.ndarray, labels: np.ndarray) -> pd.Series:
+    """Values grouped into lists by label, in order of appearance, indexed by label
+
+    Sorting once and splitting at label boundaries avoids groupby's per-group
+    Series construction, which dominates for millions of small groups.
+    """
+    if not len(values):
+        return pd.Series([], dtype=object)
+    order = np.argsort(labels, kind='stable')
+    sorted_labels = labels[order]
+    starts = np.flatnonzero(np.r_[True, sorted_labels[1:] != sorted_labels[:-1]])
+    groups = np.split(values[order], starts[1:])
+    return pd.Series([group.tolist() for group in groups], index=sorted_labels[starts], dtype=object)
+
+
+def is_list_column(series: pd.Series) -> bool:
+    """Whether a column holds provenance lists; merged columns hold a list in every row"""
+    return series.dtype == object and len(series) > 0 and isinstance(series.iloc[0], list)
+
+
+def _singleton_lists(values: np.ndarray) -> np.ndarray:
+    """Each value as a one-item list; rows with the same value share one list object"""
+    codes, uniques = pd.factorize(values, use_na_sentinel=False)
+    singletons = np.empty(len(uniques), dtype=object)
+    for position, value in enumerate(uniques):
+        singletons[position] = [value]
+    return singletons[codes]
+
+
+def _strip_org_suffix(organization: pd.Series) -> pd.Series:
+    """Drop legal-form words ('inc', 'llc', ...) unless nothing else is left"""
+    core = organization.str.replace(_ORG_SUFFIX, ' ', regex=True)
+    core = core.str.replace(_WHITESPACE, ' ', regex=True).str.strip()
+    return core.where(core != '', organization)
+
+
+class Deduplicator:
+    """Collapse duplicate contacts using hash indexes on normalized keys
+
+    Two rows are duplicates when they share a normalized email, a normalized
+    LinkedIn URL, or a normalized (full name, organization) pair; duplicates are
+    transitive. Each key is factorized into integer codes (a hash index) and
+    clusters are formed by propagating the smallest row number across rows that
+    share a code, so the work is linear in the number of rows rather than
+    pairwise.
+
+    Fuzzy matching additionally links rows whose names and organizations are
+    similar ("Jon Smith @ Acme Inc" and "John Smith @ ACME, Inc."). Candidates
+    come from sorted-neighbourhood blocking, so fuzz.ratio runs a fixed number
+    of times per row instead of once per pair of rows.
+
+    Clusters can be collapsed to their first row or merged into golden records,
+    combining each header according to survivorship_rules (see SURVIVORSHIP_RULES).
+    """
+
+    def __init__(self, survivorship_rules: Optional[Dict[str, str]] = None):
+        self.survivorship_rules = {**SURVIVORSHIP_RULES, **(survivorship_rules or {})}
+
+    def _name_and_organization(self, df: pd.DataFrame) -> Tuple[pd.Series, pd.Series]:
+        """Normalized contact name and organization, '' where missing"""
+        empty = pd.Series('', index=df.index)
+        full_name = _name_key(df['full_name']) if 'full_name' in df.columns else empty
+        first_last = (
+            (_name_key(df['first_name']) if 'first_name' in df.columns else empty) + ' ' +
+            (_name_key(df['last_name']) if 'last_name' in df.columns else empty)
+        ).str.strip()
+        # Fall back to first + last name where the full name is missing
+        name = full_name.where(full_name != '', first_last)
+        organization = _name_key(df['organization_name']) if 'organization_name' in df.columns else empty
+        return name, organization
+
+    def build_keys(self, df: pd.DataFrame) -> List[Tuple[str, np.ndarray]]:
+        """Factorize each dedupe key into codes, with -1 for rows without that key"""
+        keys = []
+
+        if 'email' in df.columns:
+            keys.append(('email', _email_key(df['email'])))
+        if 'linkedin_url' in df.columns:
+            keys.append(('linkedin_url', _url_key(df['linkedin_url'])))
+        if 'organization_name' in df.columns:
+            name, organization = self._name_and_organization(df)
+            has_both = (name != '') & (organization != '')
+            keys.append(('name_organization', (name + '\x1f' + organization).where(has_both, '')))
+
+        factorized = []
+        for key_name, values in keys:
+            codes, _ = pd.factorize(values.to_numpy(dtype=object))
+            codes[(values == '').to_numpy()] = -1
+            factorized.append((key_name, codes))
+        return factorized
+
+    def find_clusters(self, df: pd.DataFrame) -> np.ndarray:
+        """Return, for every row, the position of the first row of its duplicate cluster"""
+        labels = np.arange(len(df))
+        keys = [(codes >= 0, codes) for _, codes in self.build_keys(df)]
+
+        changed = True
+        while changed:
+            changed = False
+            for has_key, codes in keys:
+                if not has_key.any():
+                    continue
+                # Smallest label within each group of rows sharing this key
+                group_min = pd.Series(labels[has_key]).groupby(codes[has_key]).transform('min').to_numpy()
+                new_labels = labels.copy()
+                new_labels[has_key] = group_min
+
+                # Pointer jumping: follow labels to their own label until stable
+                while True:
+                    jumped = new_labels[new_labels]
+                    if np.array_equal(jumped, new_labels):
+                        break
+                    new_labels = jumped
+
+                if not np.array_equal(new_labels, labels):
+                    labels = new_labels
+                    changed = True
+
+        return labels
+
+    def find_fuzzy_pairs(self, df: pd.DataFrame, labels: Optional[np.ndarray] = None,
+                         threshold: int = FUZZY_THRESHOLD,
+                         window: int = FUZZY_WINDOW) -> Tuple[np.ndarray, np.ndarray]:
+        """Return row pairs (a, b) whose names and organizations both score >= threshold
+
+        Rows are sorted twice, by "name organization" and by "organization
+        reversed-name", and each row is compared only with its window - 1
+        successors in either order. Pairs already in the same cluster of labels
+        and pairs whose lengths alone rule out the threshold are skipped before
+        fuzz.ratio is called.
+        """
+        name, organization = self._name_and_organization(df)
+        organization = _strip_org_suffix(organization)
+        candidates = np.flatnonzero(((name != '') & (organization != '')).to_numpy())
+        if len(candidates) < 2:
+            return np.array([], dtype=np.int64), np.array([], dtype=np.int64)
+
+        name = name.to_numpy(dtype=object)[candidates]
+        organization = organization.to_numpy(dtype=object)[candidates]
+        reversed_name = pd.Series(name).str.split().str[::-1].str.join(' ').to_numpy(dtype=object)
+
+        pairs = []
+        for sort_key in (name + ' ' + organization, organization + ' ' + reversed_name):
+            order = np.argsort(sort_key, kind='stable')
+            for offset in range(1, min(window, len(order))):
+                pairs.append(np.stack([order[:-offset], order[offset:]], axis=1))
+        pairs = np.unique(np.sort(np.concatenate(pairs), axis=1), axis=0)
+        first, second = pairs[:, 0], pairs[:, 1]
+
+        if labels is not None:
+            unlinked = labels[candidates[first]] != labels[candidates[second]]
+            first, second = first[unlinked], second[unlinked]
+
+        # fuzz.ratio is at most 200 * shorter / (shorter + longer)
+        for values in (name, organization):
+            lengths = pd.Series(values).str.len().to_numpy()
+            shorter = np.minimum(lengths[first], lengths[second])
+            reachable = 200 * shorter >= threshold * (lengths[first] + lengths[second])
+            first, second = first[reachable], second[reachable]
+
+        matched = np.array([
+            fuzz.ratio(name[a], name[b]) >= threshold and
+            fuzz.ratio(organization[a], organization[b]) >= threshold
+            for a, b in zip(first, second)
+        ], dtype=bool)
+        return candidates[first[matched]], candidates[second[matched]]
+
+    def merge_pairs(self, labels: np.ndarray, first: np.ndarray, second: np.ndarray) -> np.ndarray:
+        """Join the clusters of each (first, second) row pair, keeping the smallest row as label"""
+        labels = labels.copy()
+        while True:
+            first_root, second_root = labels[first], labels[second]
+            unlinked = first_root != second_root
+            if not unlinked.any():
+                return labels
+            # Hook the larger root under the smaller one, then flatten the pointers
+            np.minimum.at(labels, np.maximum(first_root, second_root)[unlinked],
+                          np.minimum(first_root, second_root)[unlinked])
+            while True:
+                jumped = labels[labels]
+                if np.array_equal(jumped, labels):
+                    break
+                labels = jumped
+
+    def _survivor_values(self, values: pd.Series, labels: np.ndarray, rule: str) -> pd.Series:
+        """One value per cluster label of the rows in values, chosen by a survivorship rule"""
+        if rule == 'list':
+            return _group_lists(values.to_numpy(dtype=object), labels)
+
+        values = values.astype(str)
+        non_empty = values.str.strip() != ''
+        if rule == 'union':
+            items = values[non_empty].str.split(_LIST_SEPARATOR).explode().str.strip()
+            items = items[items != '']
+            # Items repeat across rows with different case; keep the first spelling
+            first_spelling = ~pd.DataFrame({'label': labels[items.index], 'item': items.str.lower()}).duplicated()
+            items = items[first_spelling.to_numpy()]
+            return _group_lists(items.to_numpy(dtype=object), labels[items.index]).map(', '.join)
+        if rule == 'most_complete':
+            completeness = values.str.count(_WORD_CHARACTER).where(non_empty, -1)
+            # Stable sort keeps the first row among equally complete values
+            order = (-completeness.to_numpy()).argsort(kind='stable')
+            order = order[np.unique(labels[order], return_index=True)[1]]
+            return pd.Series(values.to_numpy()[order], index=labels[order])
+        if rule == 'latest':
+            return values.where(non_empty).groupby(labels, sort=False).last()
+        return values.where(non_empty).groupby(labels, sort=False).first()
+
+    def merge_records(self, df: pd.DataFrame, labels: np.ndarray) -> pd.DataFrame:
+        """Merge each cluster of labels into one golden record, in order of first row
+
+        Only rows of clusters with more than one row are aggregated (with
+        groupby, per header); other rows are copied. Headers with the 'list'
+        rule hold a list in every row: the sources of a merged cluster, or a
+        one-item list shared by the unmerged rows with that value. Other
+        columns are returned as object strings.
+        """
+        positions = np.arange(len(df))
+        kept = np.flatnonzero(labels == positions)
+        duplicated = np.flatnonzero(np.bincount(labels, minlength=len(df))[labels] > 1)
+        cluster_labels = labels[duplicated]
+
+        merged = {}
+        for column in df.columns:
+            rule = self.survivorship_rules.get(column, 'first')
+            if rule == 'list':
+                merged[column] = self._merge_lists(df[column], kept, duplicated, cluster_labels)
+                continue
+            values = pd.Series(df[column].iloc[kept].to_numpy(dtype=object), index=kept)
+            if len(duplicated):
+                survivors = self._survivor_values(
+                    pd.Series(df[column].iloc[duplicated].to_numpy(dtype=object), index=np.arange(len(duplicated))),
+                    cluster_labels, rule
+                )
+                # Clusters whose values are all empty keep their first row's value
+                survivors = survivors.dropna()
+                values[survivors.index] = survivors
+            merged[column] = values.to_numpy()
+
+        return pd.DataFrame(merged, columns=df.columns)
+
+    def _merge_lists(self, column: pd.Series, kept: np.ndarray, duplicated: np.ndarray,
+                     cluster_labels: np.ndarray) -> np.ndarray:
+        """Provenance lists of the kept rows, listing every source of merged clusters"""
+        values = column.to_numpy(dtype=object)
+        merged_before = is_list_column(column)
+        lists = pd.Series(values[kept] if merged_before else _singleton_lists(values[kept]), index=kept)
+        if len(duplicated):
+            items, item_labels = values[duplicated], cluster_labels
+            if merged_before:
+                # Golden records merged again: combine their lists instead of nesting them
+                lengths = np.array([len(value) for value in items], dtype=np.int64)
+                items = np.array(list(chain.from_iterable(items)), dtype=object)
+                item_labels = np.repeat(cluster_labels, lengths)
+            survivors = _group_lists(items, item_labels)
+            lists[survivors.index] = survivors
+        return lists.to_numpy()
+
+    def _source_rows(self, sources: pd.DataFrame) -> np.ndarray:
+        """Position of each row among the rows with the same source file and sheet"""
+        # Golden records list their sources; group by the whole list
+        sources = sources.assign(**{
+            column: sources[column].map('; '.join) for column in sources.columns if is_list_column(sources[column])
+        })
+        return sources.groupby(list(sources.columns), sort=False, observed=True).cumcount().to_numpy()
+
+    def deduplicate(self, df: pd.DataFrame, fuzzy: bool = False,
+                    merge: bool = False) -> Tuple[pd.DataFrame, pd.DataFrame]:
+        """Keep the first row of each duplicate cluster, or its golden record with merge=True
+
+        Returns (deduplicated rows, merge report). The report lists every row of
+        every cluster with more than one row: its position in df, the position
+        of the row it was merged into, its source file and sheet, and its
+        source_row, the 0-based position among df's rows from that file and
+        sheet (the data row of the spreadsheet, for a master built from it).
+        With fuzzy=True, near-duplicate names at similar organizations are
+        merged too.
+        """
+        if df.empty:
+            return df, pd.DataFrame(columns=['row', 'kept_row', 'source_file', 'source_sheet', 'source_row'])
+
+        labels = self.find_clusters(df)
+        if fuzzy:
+            labels = self.merge_pairs(labels, *self.find_fuzzy_pairs(df, labels))
+        cluster_sizes = np.bincount(labels, minlength=len(df))
+        duplicated = cluster_sizes[labels] > 1
+
+        rows = np.flatnonzero(duplicated)
+        report = pd.DataFrame({
+            'row': rows,
+            'kept_row': labels[rows],
+        })
+        source_columns = [column for column in ('source_file', 'source_sheet') if column in df.columns]
+        for column in source_columns:
+            report[column] = df[column].to_numpy()[rows]
+        if source_columns:
+            report['source_row'] = self._source_rows(df[source_columns])[rows]
+        report = report.sort_values(['kept_row', 'row'], kind='stable', ignore_index=True)
+
+        if merge:
+            return self.merge_records(df, labels), report
+        kept = labels == np.arange(len(df))
+        return df.iloc[np.flatnonzero(kept)].reset_index(drop=True), report
@@ -0,0 +1,188 @@
+import re
+from typing import Callable, Dict
+
+import numpy as np
+import pandas as pd
+
+# Field type of each master header whose values are normalized
+FIELD_TYPES: Dict[str, str] = {
+    'email': 'email',
+    'phone_numbers': 'phone',
+    'company_phone': 'phone',
+    'linkedin_url': 'url',
+    'account_linkedin': 'url',
+    'organization_linkedin_url': 'url',
+    'website': 'url',
+    'organization_name_url': 'url',
+    'facebook_url': 'url',
+    'twitter_url': 'url',
+    'contact_country': 'country',
+    'organization_country': 'country',
+}
+
+# Lowercased spellings and ISO codes of common countries, by canonical name
+COUNTRY_ALIASES: Dict[str, str] = {
+    'us': 'United States', 'usa': 'United States', 'u.s.': 'United States', 'u.s.a.': 'United States',
+    'united states': 'United States', 'united states of america': 'United States', 'america': 'United States',
+    'uk': 'United Kingdom', 'u.k.': 'United Kingdom', 'gb': 'United Kingdom', 'great britain': 'United Kingdom',
+    'united kingdom': 'United Kingdom', 'england': 'United Kingdom', 'britain': 'United Kingdom',
+    'ca': 'Canada', 'canada': 'Canada',
+    'de': 'Germany', 'germany': 'Germany', 'deutschland': 'Germany',
+    'fr': 'France', 'france': 'France',
+    'es': 'Spain', 'spain': 'Spain', 'españa': 'Spain',
+    'it': 'Italy', 'italy': 'Italy',
+    'nl': 'Netherlands', 'netherlands': 'Netherlands', 'the netherlands': 'Netherlands', 'holland': 'Netherlands',
+    'ie': 'Ireland', 'ireland': 'Ireland',
+    'ch': 'Switzerland', 'switzerland': 'Switzerland',
+    'se': 'Sweden', 'sweden': 'Sweden',
+    'au': 'Australia', 'australia': 'Australia',
+    'nz': 'New Zealand', 'new zealand': 'New Zealand',
+    'in': 'India', 'india': 'India',
+    'cn': 'China', 'china': 'China', "people's republic of china": 'China',
+    'jp': 'Japan', 'japan': 'Japan',
+    'sg': 'Singapore', 'singapore': 'Singapore',
+    'br': 'Brazil', 'brazil': 'Brazil', 'brasil': 'Brazil',
+    'mx': 'Mexico', 'mexico': 'Mexico',
+    'ae': 'United Arab Emirates', 'uae': 'United Arab Emirates', 'united arab emirates': 'United Arab Emirates',
+    'il': 'Israel', 'israel': 'Israel',
+    'za': 'South Africa', 'south africa': 'South Africa',
+    'kr': 'South Korea', 'korea': 'South Korea', 'south korea': 'South Korea', 'republic of korea': 'South Korea',
+}
+
+_MAILTO = re.compile(r'^mailto:', re.IGNORECASE)
+_EXCEL_FLOAT = re.compile(r'\.0$')
+_PHONE_EXTENSION = re.compile(r'\s*(?:x|ext\.?|extension)\s*(\d{1,6})$', re.IGNORECASE)
+_PHONE_CHARACTERS = re.compile(r'\+?[\d\s().\-/]+')
+# Deletes the separators _PHONE_CHARACTERS allows, leaving only digits
+_PHONE_SEPARATORS = str.maketrans('', '', '+ ().-/')
+_VALUE_SEPARATOR = re.compile(r'\s*[,;]\s*')
+# Scheme and 'www.' are dropped; fragments do not change the page
+_URL_PARTS = re.compile(
+    r'^(?:https?://)?(?:www\.)?(?P<host>[^/?#\s]+)(?P<path>[^?#\s]*)(?:\?(?P<query>[^#\s]*))?(?:#\S*)?$',
+    re.IGNORECASE
+)
+_URL_HOST = re.compile(r'[^\s/:]+\.[a-z]{2,}(:\d+)?')
+# Query parameters that only track where a click came from
+_TRACKING_PARAMETER = re.compile(
+    r'(utm_\w+|trk|trkinfo|fbclid|gclid|dclid|gbraid|wbraid|msclkid|mc_cid|mc_eid|igshid|_hsenc|_hsmi|ref_src)(=|$)',
+    re.IGNORECASE
+)
+
+
+def _as_strings(column: pd.Series) -> pd.Series:
+    """Stripped object strings, with missing values as ''"""
+    if isinstance(column.dtype, pd.CategoricalDtype):
+        column = column.astype(object)
+    if column.hasnans:
+        column = column.fillna('')
+    return column.astype(str).str.strip()
+
+
+def _map_distinct(values: pd.Series, normalize: Callable[[pd.Series], pd.Series]) -> pd.Series:
+    """Normalize each distinct value once, for low-cardinality fields"""
+    codes, uniques = pd.factorize(values.to_numpy(dtype=object))
+    normalized = normalize(pd.Series(uniques, dtype=object)).to_numpy(dtype=object)
+    return pd.Series(normalized[codes], index=values.index)
+
+
+def normalize_email(values: pd.Series) -> pd.Series:
+    """Lowercased addresses without a 'mailto:' prefix"""
+    return values.str.replace(_MAILTO, '', regex=True).str.lower()
+
+
+def _normalize_single_phone(values: pd.Series) -> pd.Series:
+    main = values.str.replace(_EXCEL_FLOAT, '', regex=True)
+    extension = pd.Series(np.nan, index=values.index, dtype=object)
+    # Only values containing an 'x' can have an extension; skip the regex for the rest
+    has_extension = main.str.contains('x', case=False, regex=False)
+    if has_extension.any():
+        with_extension = main[has_extension]
+        extension[has_extension] = with_extension.str.extract(_PHONE_EXTENSION, expand=False)
+        main[has_extension] = with_extension.str.replace(_PHONE_EXTENSION, '', regex=True)
+    digits = main.str.translate(_PHONE_SEPARATORS)
+
+    normalized = (
+        np.where(main.str.startswith('+'), '+', '') + digits +
+        np.where(extension.notna(), ' x' + extension.fillna(''), '')
+    )
+    # Text ("call reception") and implausible digit counts are left as they were
+    plausible = main.str.fullmatch(_PHONE_CHARACTERS) & digits.str.len().between(7, 15)
+    return pd.Series(normalized, index=values.index).where(plausible, values)
+
+
+def normalize_phone(values: pd.Series) -> pd.Series:
+    """Digits with an optional leading '+' and ' x<extension>'; lists are normalized per number"""
+    normalized = _normalize_single_phone(values)
+    multiple = values.str.contains(',', regex=False) | values.str.contains(';', regex=False)
+    if multiple.any():
+        numbers = values[multiple].str.split(_VALUE_SEPARATOR).explode()
+        numbers = numbers[numbers != '']
+        owners = numbers.index
+        numbers = _normalize_single_phone(numbers.reset_index(drop=True))
+        normalized[multiple] = numbers.groupby(owners).agg('; '.join)
+    return normalized
+
+
+def _strip_tracking(queries: pd.Series) -> pd.Series:
+    """Query strings without tracking parameters, keeping the others in order"""
+    queries = queries.reset_index(drop=True)
+    # Most query strings are a single parameter, kept or dropped whole
+    single = ~queries.str.contains('&', regex=False)
+    stripped = queries.where(~(single & queries.str.match(_TRACKING_PARAMETER)), '')
+
+    parameters = queries[~single].str.split('&').explode()
+    if len(parameters):
+        parameters = parameters[(parameters != '') & ~parameters.str.match(_TRACKING_PARAMETER)]
+        stripped[~single] = ''
+        kept = parameters.groupby(level=0).agg('&'.join)
+        stripped[kept.index] = kept
+    return stripped
+
+
+def _normalize_distinct_urls(values: pd.Series) -> pd.Series:
+    parts = values.str.extract(_URL_PARTS)
+    host = parts['host'].str.lower()
+    plausible = host.str.fullmatch(_URL_HOST, na=False)
+
+    path = parts['path'].fillna('').str.rstrip('/')
+    path = path.where(~host.str.endswith('linkedin.com', na=False), path.str.lower())
+    query = _strip_tracking(parts['query'].fillna('')).to_numpy(dtype=object)
+    normalized = 'https://' + host + path + np.where(query != '', '?' + query, '')
+    return normalized.where(plausible, values)
+
+
+def normalize_url(values: pd.Series) -> pd.Series:
+    """'https://' URLs with a lowercased host, without 'www.', tracking parameters, fragment or trailing slash
+
+    Paths keep their case, since servers may treat it as significant, except on
+    LinkedIn, whose profile and company slugs are case-insensitive. Query
+    parameters other than known trackers (utm_*, trk, fbclid, gclid, ...) are kept.
+    Repeated URLs (company pages, shared websites) are normalized once.
+    """
+    return _map_distinct(values, _normalize_distinct_urls)
+
+
+def normalize_country(values: pd.Series) -> pd.Series:
+    """Canonical country names for known spellings and ISO codes; others unchanged"""
+    return _map_distinct(values, lambda uniques: uniques.str.lower().map(COUNTRY_ALIASES).fillna(uniques))
+
+
+NORMALIZERS: Dict[str, Callable[[pd.Series], pd.Series]] = {
+    'email': normalize_email,
+    'phone': normalize_phone,
+    'url': normalize_url,
+    'country': normalize_country,
+}
+
+
+def normalize_field(header: str, column: pd.Series) -> pd.Series:
+    """Return a source column mapped to header as normalized strings ('' for missing)
+
+    Headers without a field type are only stripped. Every step is a vectorized
+    string operation or compiled regex over the whole column.
+    """
+    values = _as_strings(column)
+    field_type = FIELD_TYPES.get(header)
+    if field_type is None:
+        return values
+    return NORMALIZERS[field_type](values)
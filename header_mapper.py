@@ -1,9 +1,31 @@
 from fuzzywuzzy import fuzz
+import hashlib
+import heapq
+import math
 import re
-from typing import Dict, List, Tuple
+from collections import defaultdict
+from typing import Dict, List, Tuple, Optional
+from mapping_store import MappingStore
+
+_NON_ALPHANUMERIC = re.compile(r'[^a-zA-Z0-9]')
+
+# Character n-gram size used by the candidate pruning index
+NGRAM_SIZE = 2
+
+# Share (0-100) of sampled values that must match a content pattern before the
+# column's contents override its header-based mapping
+CONTENT_MATCH_THRESHOLD = 80
+
+
+def _ngram_counts(text: str, n: int = NGRAM_SIZE) -> Dict[str, int]:
+    """Count the character n-grams of a string"""
+    counts = defaultdict(int)
+    for i in range(len(text) - n + 1):
+        counts[text[i:i + n]] += 1
+    return counts
 
 class HeaderMapper:
-    def __init__(self):
+    def __init__(self, mapping_store: Optional[MappingStore] = None):
         # Exact 39 headers required for marketing/advertising company
         self.required_headers = [
             "first_name", "last_name", "full_name", "email", "phone_numbers", 
@@ -269,39 +291,168 @@ class HeaderMapper:
         }
         
         self.custom_mappings = {}
+        self.mapping_store = mapping_store
+        
+        # Whole-sheet mapping templates, used when no mapping store is configured
+        self.templates = {}
+        self._build_variation_index()
         
     def normalize_header(self, header: str) -> str:
         """Normalize header by removing special characters and converting to lowercase"""
-        return re.sub(r'[^a-zA-Z0-9]', '_', str(header).lower().strip())
+        return _NON_ALPHANUMERIC.sub('_', str(header).lower().strip())
+    
+    def _build_variation_index(self):
+        """Precompute normalized variations and an exact-match lookup table"""
+        # (standard header, normalized variation) pairs in pattern order
+        self._normalized_variations = [
+            (standard_header, self.normalize_header(variation))
+            for standard_header, variations in self.header_mapping_patterns.items()
+            for variation in variations
+        ]
+        
+        variation_ids = {}
+        for variation_id, (standard_header, variation) in enumerate(self._normalized_variations):
+            variation_ids.setdefault((standard_header, variation), variation_id)
+        
+        # Candidates scored for suggestions: each required header, then its variations.
+        # The third item is the candidate's position in _normalized_variations (None for
+        # a required header's own name), which orders ties when picking the auto-mapping
+        self._suggestion_candidates = []
+        for standard_header in self.required_headers:
+            self._suggestion_candidates.append((standard_header, self.normalize_header(standard_header), None))
+            for variation in self.header_mapping_patterns.get(standard_header, []):
+                normalized_variation = self.normalize_header(variation)
+                self._suggestion_candidates.append(
+                    (standard_header, normalized_variation, variation_ids[(standard_header, normalized_variation)])
+                )
+        
+        # Combined auto-mapping and suggestion results per normalized header
+        self._match_cache = {}
+        
+        # Exact hits: the first variation wins, as it does in the fuzzy loop on a
+        # tied score of 100, and a required header's own name overrides variations
+        self._exact_matches = {}
+        for standard_header, normalized_variation in self._normalized_variations:
+            self._exact_matches.setdefault(normalized_variation, standard_header)
+        for standard_header in self.required_headers:
+            self._exact_matches[self.normalize_header(standard_header)] = standard_header
+            
+        # Variations listed under more than one standard header ('name', 'summary'),
+        # whose exact hit is only a guess
+        standards_by_variation = defaultdict(set)
+        for standard_header, normalized_variation in self._normalized_variations:
+            standards_by_variation[normalized_variation].add(standard_header)
+        self._ambiguous_variations = {
+            variation for variation, standard_headers in standards_by_variation.items()
+            if len(standard_headers) > 1
+        }
+            
+        # Inverted n-gram index over the normalized variations, used to shortlist
+        # the variations that can still reach a score threshold (find_best_match,
+        # get_top_matches and template alternatives; match_headers scans them all)
+        self._ngram_index = defaultdict(list)
+        self._variations_by_length = defaultdict(list)
+        for variation_id, (_, variation) in enumerate(self._normalized_variations):
+            self._variations_by_length[len(variation)].append(variation_id)
+            for ngram, count in _ngram_counts(variation).items():
+                self._ngram_index[ngram].append((variation_id, count))
+    
+    def _shortlist_variations(self, normalized_header: str, threshold: int) -> List[int]:
+        """Return ids of the variations whose fuzz.ratio with the header can reach threshold
+        
+        fuzz.ratio is round(100 * 2M / (len_a + len_b)) with M at most the longest
+        common subsequence L, so a score >= threshold needs L >= min_lcs. Turning a
+        into b then takes (len_a - L) deletions, each destroying at most n of a's
+        n-grams, and (len_b - L) insertions, each splitting at most n - 1, which
+        bounds from below the n-grams the two strings must share. Variations below
+        that bound (or failing the length bound) cannot score >= threshold.
+        """
+        header_length = len(normalized_header)
+        min_ratio = (threshold - 0.5) / 100
+        
+        shared = defaultdict(int)
+        for ngram, count in _ngram_counts(normalized_header).items():
+            for variation_id, variation_count in self._ngram_index.get(ngram, ()):
+                shared[variation_id] += min(count, variation_count)
+                
+        candidates = []
+        for variation_length, variation_ids in self._variations_by_length.items():
+            total_length = header_length + variation_length
+            min_lcs = math.ceil(min_ratio * total_length / 2 - 1e-9)
+            if min_lcs > min(header_length, variation_length):
+                continue
+                
+            required_shared = max(
+                self._min_shared_ngrams(header_length, variation_length, min_lcs),
+                self._min_shared_ngrams(variation_length, header_length, min_lcs)
+            )
+            if required_shared <= 0:
+                candidates.extend(variation_ids)
+            else:
+                candidates.extend(
+                    variation_id for variation_id in variation_ids
+                    if shared.get(variation_id, 0) >= required_shared
+                )
+                
+        # Pattern order decides ties, so keep the shortlist in that order
+        return sorted(candidates)
+    
+    def _min_shared_ngrams(self, source_length: int, target_length: int, lcs: int) -> int:
+        """Lower bound on shared n-grams for strings with a common subsequence of length lcs"""
+        return ((source_length - NGRAM_SIZE + 1)
+                - NGRAM_SIZE * (source_length - lcs)
+                - (NGRAM_SIZE - 1) * (target_length - lcs))
+    
+    def get_top_matches(self, header: str, k: int = 5, threshold: int = 80, 
+                        prune: bool = True) -> List[Tuple[str, int]]:
+        """Return the k best (standard header, score) variation matches scoring >= threshold
+        
+        Ties keep pattern order. With prune=False every variation is scored.
+        """
+        normalized_header = self.normalize_header(header)
+        
+        if prune and threshold > 0:
+            variation_ids = self._shortlist_variations(normalized_header, threshold)
+        else:
+            variation_ids = range(len(self._normalized_variations))
+            
+        matches = []
+        for variation_id in variation_ids:
+            standard_header, variation = self._normalized_variations[variation_id]
+            score = fuzz.ratio(normalized_header, variation)
+            if score >= threshold:
+                matches.append((standard_header, score))
+                
+        matches.sort(key=lambda match: match[1], reverse=True)
+        return matches[:k]
+    
+    def add_header_variation(self, standard_header: str, variation: str):
+        """Add a header variation (synonym) for a standard header"""
+        if standard_header not in self.required_headers:
+            raise ValueError(f"Unknown standard header: {standard_header}")
+        self.header_mapping_patterns.setdefault(standard_header, []).append(variation)
+        self._build_variation_index()
     
     def find_best_match(self, header: str, threshold: int = 80) -> Tuple[str, int]:
         """Find the best matching standard header using fuzzy matching"""
         normalized_header = self.normalize_header(header)
         
-        # Check custom mappings first
-        if normalized_header in self.custom_mappings:
-            return self.custom_mappings[normalized_header], 100
+        # Check custom mappings first, then mappings confirmed in earlier sessions
+        found, standard_header = self._find_confirmed_mapping(normalized_header)
+        if found:
+            return standard_header, 100
             
-        best_match = None
-        best_score = 0
-        best_standard = None
-        
         # Check exact matches first
-        for standard_header in self.required_headers:
-            if normalized_header == self.normalize_header(standard_header):
-                return standard_header, 100
+        if normalized_header in self._exact_matches:
+            return self._exact_matches[normalized_header], 100
+        
+        # Check pattern matches, scoring only the shortlisted variations
+        top_matches = self.get_top_matches(header, k=1, threshold=threshold)
         
-        # Check pattern matches
-        for standard_header, variations in self.header_mapping_patterns.items():
-            for variation in variations:
-                score = fuzz.ratio(normalized_header, self.normalize_header(variation))
-                if score > best_score and score >= threshold:
-                    best_score = score
-                    best_match = variation
-                    best_standard = standard_header
-                    
         # If no good match found, return None to indicate unmapped header
-        return best_standard if best_match else None, best_score
+        if not top_matches:
+            return None, 0
+        return top_matches[0]
     
     def map_headers(self, headers: List[str]) -> Dict[str, str]:
         """Map a list of headers to standardized versions"""
@@ -317,32 +468,192 @@ class HeaderMapper:
         normalized = self.normalize_header(original)
         self.custom_mappings[normalized] = standard
         
-    def get_mapping_suggestions(self, headers: List[str]) -> Dict[str, List[Tuple[str, int]]]:
-        """Get top 3 suggestions for each header"""
+    def save_confirmed_mappings(self, mappings: Dict[str, str]):
+        """Persist user-confirmed mappings to the mapping store, if one is configured"""
+        if self.mapping_store is None:
+            return
+        self.mapping_store.update_mappings({
+            self.normalize_header(original): standard for original, standard in mappings.items()
+        })
+        
+    def _find_confirmed_mapping(self, normalized_header: str) -> Tuple[bool, Optional[str]]:
+        """Look a header up in the custom mappings, then in the persistent store"""
+        if normalized_header in self.custom_mappings:
+            return True, self.custom_mappings[normalized_header]
+            
+        if self.mapping_store is not None:
+            learned_mappings = self.mapping_store.get_mappings()
+            if normalized_header in learned_mappings:
+                return True, learned_mappings[normalized_header]
+                
+        return False, None
+        
+    def header_fingerprint(self, headers: List[str]) -> str:
+        """Fingerprint a sheet by its set of normalized headers"""
+        normalized_headers = sorted({self.normalize_header(header) for header in headers})
+        return hashlib.sha1('\x1f'.join(normalized_headers).encode('utf-8')).hexdigest()
+        
+    def save_templates(self, sheets: List[Tuple[List[str], Dict[str, str]]]):
+        """Save confirmed (sheet headers, mapping) pairs as reusable sheet templates
+        
+        Only the headers in a sheet's mapping are saved; the others are left to
+        per-header matching when the template is applied.
+        """
+        templates = {}
+        for headers, mapping in sheets:
+            template_mapping = {
+                self.normalize_header(header): mapping[header] for header in headers if header in mapping
+            }
+            if template_mapping:
+                templates[self.header_fingerprint(headers)] = {
+                    'headers': sorted({self.normalize_header(header) for header in headers}),
+                    'mapping': template_mapping
+                }
+            
+        if self.mapping_store is not None:
+            self.mapping_store.update_templates(templates)
+        else:
+            self.templates.update(templates)
+            
+    def apply_template(self, headers: List[str], min_similarity: float = 0.8) -> Dict[str, Optional[str]]:
+        """Map a sheet's headers from a saved template
+        
+        An exact fingerprint match maps every header in one lookup. Otherwise the
+        most similar template (Jaccard similarity of the normalized header sets of at
+        least min_similarity) maps the headers the two share; the differing headers
+        are left out for per-header matching. Returns {} when no template applies.
+        """
+        templates = self.mapping_store.get_templates() if self.mapping_store is not None else self.templates
+        if not templates:
+            return {}
+            
+        template = templates.get(self.header_fingerprint(headers))
+        if template is None:
+            normalized_headers = {self.normalize_header(header) for header in headers}
+            best_similarity = 0
+            for candidate in templates.values():
+                template_headers = set(candidate['headers'])
+                similarity = len(normalized_headers & template_headers) / len(normalized_headers | template_headers)
+                if similarity > best_similarity:
+                    best_similarity = similarity
+                    template = candidate
+            if best_similarity < min_similarity:
+                return {}
+                
+        template_mapping = template['mapping']
+        mapping = {}
+        for header in headers:
+            normalized_header = self.normalize_header(header)
+            if normalized_header in template_mapping:
+                mapping[header] = template_mapping[normalized_header]
+                
+        return mapping
+        
+    def get_mapping_suggestions(self, headers: List[str], 
+                                content_scores: Optional[Dict[str, Dict[str, int]]] = None
+                                ) -> Dict[str, List[Tuple[str, int]]]:
+        """Get top 5 suggestions for each header"""
+        _, suggestions = self.match_headers(headers, content_scores=content_scores)
+        return suggestions
+    
+    def match_headers(self, headers: List[str], threshold: int = 80, k: int = 5,
+                      content_scores: Optional[Dict[str, Dict[str, int]]] = None
+                      ) -> Tuple[Dict[str, str], Dict[str, List[Tuple[str, int]]]]:
+        """Map headers and collect their top-k suggestions in a single scoring pass
+        
+        Returns (mapping, suggestions) in the formats of map_headers and
+        get_mapping_suggestions. Fuzzy results are memoized per normalized header.
+        content_scores ({header: {standard header: score}}, from
+        content_classifier.score_column) are merged into the suggestions and decide
+        the mapping of headers that are unmapped, fuzzy or ambiguous.
+        """
+        mapping = {}
         suggestions = {}
         
         for header in headers:
             normalized_header = self.normalize_header(header)
-            candidates = []
-            
-            # Check against all required headers and their patterns
-            for standard_header in self.required_headers:
-                # Direct match with standard header
-                score = fuzz.ratio(normalized_header, self.normalize_header(standard_header))
-                candidates.append((standard_header, score))
+            cache_key = (normalized_header, threshold, k)
+            if cache_key not in self._match_cache:
+                self._match_cache[cache_key] = self._score_header(normalized_header, threshold, k)
+            fuzzy_match, header_suggestions = self._match_cache[cache_key]
+            
+            # Confirmed and exact mappings take precedence, as in find_best_match
+            found, standard_header = self._find_confirmed_mapping(normalized_header)
+            if found:
+                mapping[header] = standard_header
+            elif normalized_header in self._exact_matches:
+                mapping[header] = self._exact_matches[normalized_header]
+            else:
+                mapping[header] = fuzzy_match
+            suggestions[header] = list(header_suggestions)
+            
+            header_content_scores = (content_scores or {}).get(header)
+            if header_content_scores:
+                suggestions[header] = self._merge_content_scores(suggestions[header], header_content_scores, k)
                 
-                # Match with variations if they exist
-                if standard_header in self.header_mapping_patterns:
-                    for variation in self.header_mapping_patterns[standard_header]:
-                        score = fuzz.ratio(normalized_header, self.normalize_header(variation))
-                        candidates.append((standard_header, score))
-                    
-            # Sort by score, remove duplicates, and get top 5
-            candidates = list(set(candidates))  # Remove duplicates
-            candidates.sort(key=lambda x: x[1], reverse=True)
-            suggestions[header] = candidates[:5]  # Show top 5 matches
+                # Content decides only where the header alone does not
+                decided_by_header = found or (
+                    normalized_header in self._exact_matches
+                    and normalized_header not in self._ambiguous_variations
+                )
+                content_standard, content_score = max(header_content_scores.items(), key=lambda item: item[1])
+                if (not decided_by_header and content_score >= CONTENT_MATCH_THRESHOLD
+                        and mapping[header] not in header_content_scores):
+                    mapping[header] = content_standard
+            
+        return mapping, suggestions
+    
+    def _merge_content_scores(self, header_suggestions: List[Tuple[str, int]], 
+                              header_content_scores: Dict[str, int], k: int) -> List[Tuple[str, int]]:
+        """Merge content scores into fuzzy suggestions, keeping each standard header's best score"""
+        best_scores = {}
+        for standard_header, score in list(header_content_scores.items()) + header_suggestions:
+            if score > best_scores.get(standard_header, -1):
+                best_scores[standard_header] = score
+        
+        # sorted() is stable, so content candidates win ties in their priority order
+        return sorted(best_scores.items(), key=lambda item: item[1], reverse=True)[:k]
+    
+    def _score_header(self, normalized_header: str, threshold: int, 
+                      k: int) -> Tuple[str, List[Tuple[str, int]]]:
+        """Score a header against every candidate once for both mapping and suggestions
+        
+        The n-gram shortlist is not used here. Suggestions are the k best scores
+        with no floor, and most headers have fewer than k candidates scoring
+        threshold or more (under 2% of perturbed variations have 5 at 80). A
+        shortlist at the k-th best score (typically ~60) keeps over 80% of the
+        variations and costs more than this scan. Results are memoized per
+        normalized header instead.
+        """
+        best_standard = None
+        best_score = 0
+        best_variation_id = None
+        
+        # Min-heap of the k best distinct (standard header, score) pairs; earlier
+        # candidates win ties
+        heap = []
+        seen = set()
+        
+        for position, (standard_header, candidate, variation_id) in enumerate(self._suggestion_candidates):
+            score = fuzz.ratio(normalized_header, candidate)
             
-        return suggestions
+            if variation_id is not None and score >= threshold and (
+                score > best_score or (score == best_score and variation_id < best_variation_id)
+            ):
+                best_standard, best_score, best_variation_id = standard_header, score, variation_id
+                
+            if (standard_header, score) in seen:
+                continue
+            seen.add((standard_header, score))
+            
+            entry = (score, -position, standard_header)
+            if len(heap) < k:
+                heapq.heappush(heap, entry)
+            elif entry > heap[0]:
+                heapq.heapreplace(heap, entry)
+                
+        header_suggestions = [(standard_header, score) for score, _, standard_header in sorted(heap, reverse=True)]
+        return best_standard, header_suggestions
     
     def get_required_headers(self) -> List[str]:
         """Return the list of required headers"""
@@ -0,0 +1,106 @@
+import json
+import logging
+import os
+import tempfile
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+try:
+    import fcntl
+except ImportError:
+    # No advisory file locks (Windows): concurrent writers fall back to last writer wins
+    fcntl = None
+
+
+class MappingStore:
+    """JSON file of confirmed header mappings, shared across sessions and replicas
+
+    'mappings' holds normalized source header -> standard header (None records a
+    header confirmed as unmapped); 'templates' holds whole-sheet mappings keyed by
+    a fingerprint of the sheet's normalized header set. Every write goes through
+    a temporary file and os.replace, so readers never see a partial file, and the
+    file is re-read whenever another process has replaced it. Writers hold an
+    exclusive lock on a sidecar '.lock' file while they re-read, merge and
+    replace the store, so concurrent writers keep each other's entries.
+    """
+
+    def __init__(self, path: str):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._data = {'mappings': {}, 'templates': {}}
+        self._mtime = None
+        self._refresh()
+
+    def _refresh(self, force: bool = False):
+        """Reload the file if it changed since it was last read (always with force)"""
+        try:
+            mtime = self.path.stat().st_mtime_ns
+        except FileNotFoundError:
+            return
+
+        if mtime == self._mtime and not force:
+            return
+
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError) as e:
+            logging.warning(f"Could not read mapping store {self.path}: {str(e)}")
+            return
+
+        self._data = {'mappings': {}, 'templates': {}, **data}
+        self._mtime = mtime
+
+    def _write(self):
+        """Atomically replace the store file with the current contents"""
+        with tempfile.NamedTemporaryFile('w', dir=self.path.parent, suffix='.tmp',
+                                         delete=False, encoding='utf-8') as f:
+            json.dump(self._data, f, indent=2, sort_keys=True)
+        os.replace(f.name, self.path)
+        self._mtime = self.path.stat().st_mtime_ns
+
+    def get_mappings(self) -> Dict[str, Optional[str]]:
+        """Return all learned mappings (normalized header -> standard header)"""
+        self._refresh()
+        return self._data['mappings']
+
+    def get_templates(self) -> Dict[str, Dict[str, Any]]:
+        """Return all saved sheet templates (fingerprint -> template)"""
+        self._refresh()
+        return self._data['templates']
+
+    def update_mappings(self, mappings: Dict[str, Optional[str]]):
+        """Merge confirmed mappings into the store and save it"""
+        self._update('mappings', mappings)
+
+    def update_templates(self, templates: Dict[str, Dict[str, Any]]):
+        """Merge sheet templates into the store and save it"""
+        self._update('templates', templates)
+
+    def _update(self, section: str, entries: Dict[str, Any]):
+        """Merge entries into one section of the store and save it"""
+        if not entries:
+            return
+
+        try:
+            with self._lock():
+                # Re-read under the lock (mtimes can be coarse) so other writers' entries are kept
+                self._refresh(force=True)
+                self._data[section].update(entries)
+                self._write()
+        except OSError as e:
+            logging.error(f"Could not save mapping store {self.path}: {str(e)}")
+
+    @contextmanager
+    def _lock(self):
+        """Hold an exclusive lock on the store's lock file"""
+        if fcntl is None:
+            yield
+            return
+        with open(self.path.with_name(self.path.name + '.lock'), 'a') as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
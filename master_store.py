@@ -0,0 +1,278 @@
+import re
+import sqlite3
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from column_profile import APPROXIMATE_ROWS, sketch_profile
+from trigram_index import required_runs
+
+# Rough in-memory size of one master sheet cell, used to turn the memory
+# budget into a number of rows per chunk
+BYTES_PER_CELL = 100
+# Rows in an Excel worksheet, including the header row
+EXCEL_MAX_ROWS = 1_048_576
+
+
+class MasterStore:
+    """On-disk (SQLite) master sheet for consolidations larger than memory
+
+    Aligned chunks are inserted as they are produced, and preview, filtering,
+    statistics and export read the table back in chunks of chunk_rows rows, so
+    memory use stays within memory_budget_mb whatever the table size. Column
+    statistics of tables with more than approximate_rows rows use sketches, as
+    in-memory profiles do, and are cached until the next write.
+    """
+
+    def __init__(self, path: str, memory_budget_mb: int = 256, approximate_rows: int = APPROXIMATE_ROWS):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.memory_budget_mb = memory_budget_mb
+        self.approximate_rows = approximate_rows
+        self.headers = []
+        self.column_stats: Dict[str, Dict[str, Any]] = {}
+        self._connection = sqlite3.connect(str(self.path), check_same_thread=False)
+        # A quarter of the budget for SQLite's page cache (negative means KiB)
+        self._connection.execute(f"PRAGMA cache_size = {-memory_budget_mb * 256}")
+        self._connection.execute("PRAGMA journal_mode = OFF")
+        self._connection.execute("PRAGMA synchronous = OFF")
+        # Text filters match like filter_data's str.contains(case=False)
+        self._connection.create_function('contains_ci', 2, self._contains, deterministic=True)
+
+        existing = self._connection.execute("PRAGMA table_info(master)").fetchall()
+        self.headers = [row[1] for row in existing]
+
+    @property
+    def chunk_rows(self) -> int:
+        """Rows that fit in the memory budget"""
+        row_bytes = max(len(self.headers), 1) * BYTES_PER_CELL
+        return max(1000, self.memory_budget_mb * 1024 * 1024 // row_bytes)
+
+    def _quote(self, name: str) -> str:
+        return '"' + name.replace('"', '""') + '"'
+
+    def reset(self, headers: List[str]):
+        """Replace the stored table with an empty one with the given columns"""
+        self.headers = list(headers)
+        self.column_stats = {}
+        columns = ', '.join(f"{self._quote(header)} TEXT" for header in self.headers)
+        with self._connection:
+            self._connection.execute("DROP TABLE IF EXISTS master")
+            self._connection.execute(f"CREATE TABLE master ({columns})")
+
+    def write_chunks(self, chunks: Iterator[pd.DataFrame]) -> int:
+        """Append aligned master sheet chunks to the table; returns the rows written"""
+        placeholders = ', '.join('?' for _ in self.headers)
+        columns = ', '.join(self._quote(header) for header in self.headers)
+        statement = f"INSERT INTO master ({columns}) VALUES ({placeholders})"
+
+        self.column_stats = {}
+        rows_written = 0
+        with self._connection:
+            for chunk in chunks:
+                self._connection.executemany(
+                    statement, chunk[self.headers].itertuples(index=False, name=None)
+                )
+                rows_written += len(chunk)
+        return rows_written
+
+    def row_count(self) -> int:
+        return self._connection.execute("SELECT COUNT(*) FROM master").fetchone()[0]
+
+    @staticmethod
+    def _contains(value: Optional[str], pattern: str) -> bool:
+        return value is not None and re.search(pattern, value, re.IGNORECASE) is not None
+
+    def _where_clause(self, filters: Optional[Dict[str, Any]]) -> Tuple[str, List[Any]]:
+        """Translate filter_data-style filters into a WHERE clause and its parameters
+
+        Text filters are case-insensitive regular expression searches, like
+        filter_data, and invalid expressions are skipped as it does; literal runs
+        every match must contain are checked first with instr. List filters keep
+        rows whose value is one of the listed values.
+        """
+        conditions = []
+        parameters = []
+        for column, filter_value in (filters or {}).items():
+            if not filter_value or column not in self.headers:
+                continue
+            if isinstance(filter_value, str):
+                try:
+                    re.compile(filter_value)
+                except re.error:
+                    continue
+                quoted = self._quote(column)
+                for run in required_runs(filter_value):
+                    # lower() only folds ASCII; non-ASCII values are left to the regex
+                    conditions.append(
+                        f"(instr(lower({quoted}), ?) > 0 OR length({quoted}) != length(CAST({quoted} AS BLOB)))"
+                    )
+                    parameters.append(run)
+                conditions.append(f"contains_ci({quoted}, ?)")
+                parameters.append(filter_value)
+            elif isinstance(filter_value, list):
+                conditions.append(f"{self._quote(column)} IN ({', '.join('?' for _ in filter_value)})")
+                parameters.extend(str(value) for value in filter_value)
+
+        if not conditions:
+            return '', []
+        return 'WHERE ' + ' AND '.join(conditions), parameters
+
+    def iter_chunks(self, filters: Optional[Dict[str, Any]] = None,
+                    columns: Optional[List[str]] = None) -> Iterator[pd.DataFrame]:
+        """Yield the (filtered) table in insertion order, chunk_rows rows at a time"""
+        where, parameters = self._where_clause(filters)
+        selected = ', '.join(self._quote(column) for column in (columns or self.headers))
+        query = f"SELECT {selected} FROM master {where} ORDER BY rowid"
+        yield from pd.read_sql_query(query, self._connection, params=parameters, chunksize=self.chunk_rows)
+
+    def preview(self, filters: Optional[Dict[str, Any]] = None,
+                limit: Optional[int] = None) -> pd.DataFrame:
+        """Return the first rows of the (filtered) table, at most chunk_rows of them"""
+        where, parameters = self._where_clause(filters)
+        limit = min(limit or self.chunk_rows, self.chunk_rows)
+        selected = ', '.join(self._quote(header) for header in self.headers)
+        return pd.read_sql_query(
+            f"SELECT {selected} FROM master {where} ORDER BY rowid LIMIT ?",
+            self._connection, params=parameters + [limit]
+        )
+
+    def count(self, filters: Optional[Dict[str, Any]] = None) -> int:
+        """Number of rows matching the filters"""
+        where, parameters = self._where_clause(filters)
+        return self._connection.execute(f"SELECT COUNT(*) FROM master {where}", parameters).fetchone()[0]
+
+    def _non_empty(self, column: str) -> str:
+        """SQL expression that is 1 for values that are not blank after stripping whitespace"""
+        return f"trim({self._quote(column)}, ' ' || char(9, 10, 11, 12, 13)) != ''"
+
+    def get_summary(self) -> Dict[str, Any]:
+        """Summary statistics in the format of SpreadsheetProcessor.get_data_summary"""
+        total_rows = self.row_count()
+        if not total_rows:
+            return {}
+
+        data_columns = [header for header in self.headers if header not in ['source_file', 'source_sheet']]
+        counts = ', '.join(f"SUM({self._non_empty(column)})" for column in data_columns)
+        source_counts = self._connection.execute(
+            "SELECT COUNT(DISTINCT source_file), COUNT(DISTINCT source_sheet) FROM master"
+        ).fetchone()
+        non_empty_counts = self._connection.execute(f"SELECT {counts} FROM master").fetchone() if counts else []
+
+        return {
+            'total_rows': total_rows,
+            'total_columns': len(self.headers),
+            'source_files': source_counts[0],
+            'source_sheets': source_counts[1],
+            'column_info': {
+                column: {
+                    'non_empty_values': non_empty or 0,
+                    'empty_values': total_rows - (non_empty or 0),
+                    'data_type': 'object'
+                }
+                for column, non_empty in zip(data_columns, non_empty_counts)
+            }
+        }
+
+    def value_counts(self, column: str, limit: Optional[int] = None) -> pd.Series:
+        """Counts of each value of a column, most common first"""
+        quoted = self._quote(column)
+        # Ties are listed in order of first appearance
+        query = f"SELECT {quoted}, COUNT(*) AS n FROM master GROUP BY {quoted} ORDER BY n DESC, MIN(rowid)"
+        parameters = []
+        if limit is not None:
+            query += " LIMIT ?"
+            parameters.append(limit)
+        rows = self._connection.execute(query, parameters).fetchall()
+        return pd.Series([count for _, count in rows], index=[value for value, _ in rows],
+                         name='count', dtype='int64')
+
+    def _coerced_values(self, column: str) -> np.ndarray:
+        """Every value of a column through pd.to_numeric, NaN where it does not parse, in row order"""
+        parts = [
+            pd.to_numeric(chunk[column], errors='coerce').to_numpy(dtype=float)
+            for chunk in self.iter_chunks(columns=[column])
+        ]
+        return np.concatenate(parts) if parts else np.array([], dtype=float)
+
+    def numeric_values(self, column: str) -> pd.Series:
+        """Values of a column that pd.to_numeric can parse, read chunk by chunk"""
+        values = self._coerced_values(column)
+        return pd.Series(values[~np.isnan(values)])
+
+    def get_column_stats(self, column: str) -> Dict[str, Any]:
+        """Column statistics in the format of DataConsolidator.get_column_stats"""
+        if column not in self.headers:
+            return {}
+        if column not in self.column_stats:
+            if self.row_count() > self.approximate_rows:
+                profile = sketch_profile(chunk[column] for chunk in self.iter_chunks(columns=[column]))
+                self.column_stats[column] = {key: value for key, value in profile.items() if key != 'data_type'}
+            else:
+                self.column_stats[column] = self._exact_column_stats(column)
+        return self.column_stats[column]
+
+    def _exact_column_stats(self, column: str) -> Dict[str, Any]:
+        """Exact column statistics from SQL aggregates and one pass over the column"""
+        quoted = self._quote(column)
+        total_values, non_empty_values, unique_values = self._connection.execute(
+            f"SELECT COUNT(*), SUM({self._non_empty(column)}), COUNT(DISTINCT {quoted}) FROM master"
+        ).fetchone()
+        stats = {
+            'total_values': total_values,
+            'non_empty_values': non_empty_values or 0,
+            'unique_values': unique_values,
+            'most_common': self.value_counts(column, limit=5).to_dict()
+        }
+
+        # Unparsed values stay in as NaN so the statistics match the in-memory profile's
+        numeric_data = pd.Series(self._coerced_values(column))
+        if numeric_data.notna().any():
+            stats['numeric_stats'] = {
+                'mean': numeric_data.mean(),
+                'median': numeric_data.median(),
+                'min': numeric_data.min(),
+                'max': numeric_data.max(),
+                'std': numeric_data.std()
+            }
+        return stats
+
+    def export(self, output: Any, format: str = 'csv', filters: Optional[Dict[str, Any]] = None):
+        """Write the (filtered) table to a path or binary buffer, one chunk at a time
+        
+        Raises ValueError for xlsx exports with more rows than an Excel worksheet holds.
+        """
+        if format == 'csv':
+            if isinstance(output, (str, Path)):
+                with open(output, 'wb') as file:
+                    return self.export(file, format, filters)
+            header = True
+            for chunk in self.iter_chunks(filters):
+                output.write(chunk.to_csv(index=False, header=header).encode('utf-8'))
+                header = False
+            if header:
+                output.write(pd.DataFrame(columns=self.headers).to_csv(index=False).encode('utf-8'))
+        elif format == 'xlsx':
+            from openpyxl import Workbook
+
+            rows = self.count(filters)
+            if rows + 1 > EXCEL_MAX_ROWS:
+                raise ValueError(
+                    f"{rows:,} rows do not fit in an Excel worksheet ({EXCEL_MAX_ROWS - 1:,} at most); export as CSV"
+                )
+
+            # Write-only workbooks stream rows to disk instead of keeping them in memory
+            workbook = Workbook(write_only=True)
+            worksheet = workbook.create_sheet('Master_Sheet')
+            worksheet.append(self.headers)
+            for chunk in self.iter_chunks(filters):
+                for row in chunk.itertuples(index=False, name=None):
+                    worksheet.append(row)
+            workbook.save(output)
+        else:
+            raise ValueError(f"Unsupported export format: {format}")
+
+    def close(self):
+        self._connection.close()
@@ -0,0 +1,108 @@
+import hashlib
+import logging
+import os
+import pickle
+import tempfile
+from pathlib import Path
+from typing import List, Optional, Set
+
+import pandas as pd
+
+# Part of every key; bump it whenever parsing changes what an upload parses to
+# (e.g. CSV cells read as text), so entries written by older code are not served
+PARSE_FORMAT_VERSION = 2
+
+
+class ParseCache:
+    """On-disk cache of parsed uploads, keyed by a hash of the uploaded bytes
+
+    Entries are pickled (protocol 5) lists of DataFrames, which keeps dtypes and
+    attrs intact, together with the column selection they were parsed with
+    (None for every column). An entry serves any request for a subset of its
+    columns. When the cache grows past max_bytes the least recently used
+    entries are evicted.
+    """
+
+    def __init__(self, cache_dir: str, max_bytes: int = 1024 ** 3):
+        self.cache_dir = Path(cache_dir)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+
+    def make_key(self, data: bytes, file_name: str) -> str:
+        """Build a cache key from the file contents and its format"""
+        digest = hashlib.blake2b(data, digest_size=20)
+        # The same bytes parse differently as CSV and as Excel
+        digest.update(Path(file_name).suffix.lower().encode('utf-8'))
+        digest.update(f"v{PARSE_FORMAT_VERSION}".encode('utf-8'))
+        return digest.hexdigest()
+
+    def _entry_path(self, key: str) -> Path:
+        return self.cache_dir / f"{key}.pkl"
+
+    def get(self, key: str, usecols: Optional[Set[str]] = None) -> Optional[List[pd.DataFrame]]:
+        """Return cached sheets for a key holding at least usecols (None: every column), or None on a miss"""
+        path = self._entry_path(key)
+
+        try:
+            with open(path, 'rb') as f:
+                entry = pickle.load(f)
+            cached_columns, sheets = entry['usecols'], entry['sheets']
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            logging.warning(f"Discarding unreadable parse cache entry {path.name}: {str(e)}")
+            path.unlink(missing_ok=True)
+            return None
+
+        if cached_columns is not None and (usecols is None or not set(usecols) <= set(cached_columns)):
+            # Parsed with fewer columns than requested; the caller re-parses and replaces it
+            return None
+
+        # Refresh the modification time so eviction sees this entry as recently used
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+
+        return sheets
+
+    def put(self, key: str, sheets: List[pd.DataFrame], usecols: Optional[Set[str]] = None):
+        """Store sheets parsed with usecols under a key, then evict old entries if over budget"""
+        entry = {'usecols': None if usecols is None else sorted(usecols), 'sheets': sheets}
+        temp_path = None
+        try:
+            # Write to a temporary file first so readers never see a partial entry
+            with tempfile.NamedTemporaryFile(dir=self.cache_dir, suffix='.tmp', delete=False) as f:
+                temp_path = f.name
+                pickle.dump(entry, f, protocol=5)
+            os.replace(temp_path, self._entry_path(key))
+        except Exception as e:
+            logging.warning(f"Could not write parse cache entry {key}: {str(e)}")
+            if temp_path is not None:
+                Path(temp_path).unlink(missing_ok=True)
+            return
+
+        self.evict()
+
+    def evict(self):
+        """Delete least recently used entries until the cache fits in max_bytes"""
+        entries = []
+        for path in self.cache_dir.glob('*.pkl'):
+            try:
+                stat = path.stat()
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+
+        total_size = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total_size <= self.max_bytes:
+                break
+            path.unlink(missing_ok=True)
+            total_size -= size
+
+    def clear(self):
+        """Remove every cache entry, and temporary files left by interrupted writes"""
+        for pattern in ('*.pkl', '*.tmp'):
+            for path in self.cache_dir.glob(pattern):
+                path.unlink(missing_ok=True)
@@ -1,14 +1,55 @@
 import pandas as pd
+import numpy as np
+import io
 import os
-from typing import Dict, List, Tuple, Any
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Tuple, Any, Optional, Set, Iterator
+from pandas.api.types import union_categoricals
 import logging
 from pathlib import Path
+from parse_cache import ParseCache
+from content_classifier import SAMPLE_SIZE
+from field_normalizer import FIELD_TYPES, normalize_field
+from column_profile import profile_column
+
+try:
+    import pyarrow  # noqa: F401
+    _COMPACT_STRING_DTYPE = 'string[pyarrow]'
+except ImportError:
+    # Without pyarrow, high-cardinality columns stay as object strings
+    _COMPACT_STRING_DTYPE = None
+
+# Columns with at most this many distinct values are stored as categoricals in
+# compact mode; the rest as Arrow-backed strings. An absolute cap (rather than a
+# share of the rows) means appending rows can only move a column from
+# categorical to string, so appends never need to re-examine earlier rows.
+CATEGORY_MAX_VALUES = 50_000
+
+
+def read_upload_bytes(uploaded_file: Any) -> bytes:
+    """Return the full contents of an uploaded file object"""
+    if hasattr(uploaded_file, 'getvalue'):
+        return uploaded_file.getvalue()
+    uploaded_file.seek(0)
+    return uploaded_file.read()
+
+
+def _read_upload_bytes(file_name: str, data: bytes, 
+                       usecols: Optional[Set[str]] = None) -> List[pd.DataFrame]:
+    """Parse the raw bytes of one upload (runs inside a worker process)"""
+    return SpreadsheetProcessor().read_upload(io.BytesIO(data), file_name, usecols)
+
 
 class SpreadsheetProcessor:
-    def __init__(self):
+    def __init__(self, parse_cache: Optional[ParseCache] = None, normalize_fields: bool = False):
         self.supported_formats = {'.xlsx', '.xls', '.csv'}
+        self.parse_cache = parse_cache
+        # Normalize emails, phones, URLs and countries as they enter the master sheet
+        self.normalize_fields = normalize_fields
         self.processed_sheets = {}
         self.master_data = pd.DataFrame()
+        self._required_headers = None
         
     def read_file(self, file_path: str) -> List[pd.DataFrame]:
         """Read a spreadsheet file and return list of DataFrames (one per sheet)"""
@@ -19,159 +60,352 @@ class SpreadsheetProcessor:
             
         try:
             if file_ext == '.csv':
-                df = pd.read_csv(file_path)
+                df = pd.read_csv(file_path, dtype=str)
                 return [df]
             elif file_ext in ['.xlsx', '.xls']:
-                excel_file = pd.ExcelFile(file_path)
-                sheets = []
-                for sheet_name in excel_file.sheet_names:
-                    df = pd.read_excel(file_path, sheet_name=sheet_name)
-                    df.attrs['sheet_name'] = sheet_name
-                    df.attrs['file_name'] = Path(file_path).name
-                    sheets.append(df)
-                return sheets
+                return self.read_workbook(file_path, Path(file_path).name)
         except Exception as e:
             logging.error(f"Error reading file {file_path}: {str(e)}")
             raise
             
-    def process_uploaded_files(self, uploaded_files: List[Any]) -> Dict[str, List[pd.DataFrame]]:
-        """Process multiple uploaded files and return organized data"""
+    def read_workbook(self, source: Any, file_name: str, 
+                      usecols: Optional[Set[str]] = None) -> List[pd.DataFrame]:
+        """Read every sheet of an Excel workbook, parsing the workbook only once"""
+        sheets = []
+        
+        # A single ExcelFile keeps the parsed workbook open, so each sheet is read
+        # from the same handle instead of re-parsing the zip/XML per sheet
+        with pd.ExcelFile(source) as excel_file:
+            for sheet_name in excel_file.sheet_names:
+                column_positions = None
+                if usecols is not None:
+                    header = excel_file.parse(sheet_name, nrows=0).columns
+                    column_positions = self._column_positions(header, usecols)
+                df = excel_file.parse(sheet_name, usecols=column_positions)
+                df.attrs['sheet_name'] = sheet_name
+                df.attrs['file_name'] = file_name
+                if usecols is not None:
+                    df.attrs['source_columns'] = list(header)
+                sheets.append(df)
+                
+        return sheets
+            
+    def read_upload(self, source: Any, file_name: str, 
+                    usecols: Optional[Set[str]] = None) -> List[pd.DataFrame]:
+        """Read a single uploaded CSV or Excel file into a list of DataFrames
+        
+        If usecols is given, only those columns are parsed and the full header
+        is kept in attrs['source_columns'].
+        """
+        file_ext = Path(file_name).suffix.lower()
+        
+        # Uploads may already have been read once (e.g. by a header scan)
+        if hasattr(source, 'seek'):
+            source.seek(0)
+            
+        if file_ext == '.csv':
+            column_positions = None
+            if usecols is not None:
+                header = pd.read_csv(source, nrows=0).columns
+                column_positions = self._column_positions(header, usecols)
+                source.seek(0)
+            # Read CSV cells as text, like the streaming reader: inferred dtypes
+            # drop leading zeros ('0044...') and turn ints with blanks into '100.0'
+            df = pd.read_csv(source, dtype=str, usecols=column_positions)
+            df.attrs['sheet_name'] = 'Sheet1'
+            df.attrs['file_name'] = file_name
+            if usecols is not None:
+                df.attrs['source_columns'] = list(header)
+            return [df]
+        elif file_ext in ['.xlsx', '.xls']:
+            return self.read_workbook(source, file_name, usecols)
+            
+        raise ValueError(f"Unsupported file format: {file_ext}")
+            
+    def process_uploaded_files(self, uploaded_files: List[Any], max_workers: int = 1, 
+                               usecols: Optional[Set[str]] = None) -> Dict[str, List[pd.DataFrame]]:
+        """Process multiple uploaded files and return organized data
+        
+        With max_workers > 1 the files are parsed concurrently in a process pool.
+        If usecols is given, only those columns are read from each sheet.
+        """
+        supported_files = [
+            uploaded_file for uploaded_file in uploaded_files
+            if Path(uploaded_file.name).suffix.lower() in self.supported_formats
+        ]
+        
+        if self.parse_cache is not None:
+            return self._process_files_with_cache(supported_files, max_workers, usecols)
+            
+        return self._parse_files(supported_files, max_workers, usecols)
+        
+    def _parse_files(self, uploaded_files: List[Any], max_workers: int = 1, 
+                     usecols: Optional[Set[str]] = None) -> Dict[str, List[pd.DataFrame]]:
+        """Parse supported uploads, sequentially or in a process pool"""
+        if max_workers > 1 and len(uploaded_files) > 1:
+            return self._process_files_in_pool(uploaded_files, max_workers, usecols)
+            
         processed_data = {}
         
         for uploaded_file in uploaded_files:
             try:
-                file_name = uploaded_file.name
-                file_ext = Path(file_name).suffix.lower()
+                processed_data[uploaded_file.name] = self.read_upload(
+                    uploaded_file, uploaded_file.name, usecols
+                )
+            except Exception as e:
+                logging.error(f"Error processing file {uploaded_file.name}: {str(e)}")
+                continue
                 
-                if file_ext == '.csv':
-                    df = pd.read_csv(uploaded_file)
-                    df.attrs['sheet_name'] = 'Sheet1'
-                    df.attrs['file_name'] = file_name
-                    processed_data[file_name] = [df]
+        return processed_data
+        
+    def _process_files_in_pool(self, uploaded_files: List[Any], max_workers: int, 
+                               usecols: Optional[Set[str]] = None) -> Dict[str, List[pd.DataFrame]]:
+        """Parse uploaded files in worker processes, isolating per-file failures"""
+        processed_data = {}
+        pending = []
+        
+        # Spawned (not forked) workers, since the Streamlit server process is multi-threaded
+        context = multiprocessing.get_context('spawn')
+        with ProcessPoolExecutor(max_workers=min(max_workers, len(uploaded_files)), 
+                                 mp_context=context) as executor:
+            for uploaded_file in uploaded_files:
+                try:
+                    data = read_upload_bytes(uploaded_file)
+                    future = executor.submit(_read_upload_bytes, uploaded_file.name, data, usecols)
+                    pending.append((uploaded_file.name, future))
+                except Exception as e:
+                    logging.error(f"Error processing file {uploaded_file.name}: {str(e)}")
+                    continue
                     
-                elif file_ext in ['.xlsx', '.xls']:
-                    excel_file = pd.ExcelFile(uploaded_file)
-                    sheets = []
-                    for sheet_name in excel_file.sheet_names:
-                        df = pd.read_excel(uploaded_file, sheet_name=sheet_name)
-                        df.attrs['sheet_name'] = sheet_name
-                        df.attrs['file_name'] = file_name
-                        sheets.append(df)
-                    processed_data[file_name] = sheets
+            # Collect in upload order so the result matches the sequential loop
+            for file_name, future in pending:
+                try:
+                    processed_data[file_name] = future.result()
+                except Exception as e:
+                    logging.error(f"Error processing file {file_name}: {str(e)}")
+                    continue
                     
+        return processed_data
+        
+    def _process_files_with_cache(self, uploaded_files: List[Any], max_workers: int = 1, 
+                                  usecols: Optional[Set[str]] = None) -> Dict[str, List[pd.DataFrame]]:
+        """Serve repeated uploads from the parse cache and parse only the misses"""
+        cached_data = {}
+        misses = []
+        cache_keys = {}
+        
+        for uploaded_file in uploaded_files:
+            try:
+                key = self.parse_cache.make_key(read_upload_bytes(uploaded_file), uploaded_file.name)
             except Exception as e:
                 logging.error(f"Error processing file {uploaded_file.name}: {str(e)}")
                 continue
                 
+            sheets = self.parse_cache.get(key, usecols)
+            if sheets is None:
+                misses.append(uploaded_file)
+                cache_keys[uploaded_file.name] = key
+            else:
+                cached_data[uploaded_file.name] = sheets
+                
+        # Misses are parsed with only the wanted columns; the entry serves any subset of them
+        parsed_data = self._parse_files(misses, max_workers, usecols)
+        for file_name, sheets in parsed_data.items():
+            self.parse_cache.put(cache_keys[file_name], sheets, usecols)
+            
+        processed_data = {}
+        for uploaded_file in uploaded_files:
+            file_name = uploaded_file.name
+            sheets = cached_data.get(file_name, parsed_data.get(file_name))
+            if sheets is None:
+                continue
+                
+            selected_sheets = []
+            for sheet in sheets:
+                if usecols is not None:
+                    source_columns = self.get_sheet_headers(sheet)
+                    sheet = sheet.iloc[:, self._column_positions(sheet.columns, usecols)]
+                    sheet.attrs['source_columns'] = source_columns
+                # The same content may have been cached under another file name
+                sheet.attrs['file_name'] = file_name
+                selected_sheets.append(sheet)
+            processed_data[file_name] = selected_sheets
+            
         return processed_data
         
+    def _column_positions(self, header: pd.Index, usecols: Set[str]) -> List[int]:
+        """Positions of the wanted columns in a sheet header
+        
+        Falls back to the first column when none are wanted so the sheet keeps its row count.
+        """
+        positions = [i for i, column in enumerate(header) if column in usecols]
+        return positions or list(range(min(1, len(header))))
+        
+    def scan_upload(self, source: Any, file_name: str, 
+                    sample_rows: int = SAMPLE_SIZE) -> List[pd.DataFrame]:
+        """Read the header row and the first sample_rows rows of each sheet in an upload
+        
+        The sampled rows feed content-based header mapping; the estimated number
+        of data rows is stored in attrs['estimated_rows'].
+        """
+        file_ext = Path(file_name).suffix.lower()
+        source.seek(0)
+        
+        if file_ext == '.csv':
+            row_estimate = self._estimate_csv_rows(source)
+            df = pd.read_csv(source, dtype=str, nrows=sample_rows)
+            df.attrs['sheet_name'] = 'Sheet1'
+            df.attrs['file_name'] = file_name
+            df.attrs['estimated_rows'] = row_estimate
+            return [df]
+        elif file_ext in ['.xlsx', '.xls']:
+            sheets = []
+            with pd.ExcelFile(source) as excel_file:
+                for sheet_name in excel_file.sheet_names:
+                    # Taken before parsing, which resets openpyxl's sheet dimensions
+                    row_estimate = self._estimate_sheet_rows(excel_file, sheet_name)
+                    df = excel_file.parse(sheet_name, nrows=sample_rows)
+                    df.attrs['sheet_name'] = sheet_name
+                    df.attrs['file_name'] = file_name
+                    df.attrs['estimated_rows'] = row_estimate
+                    sheets.append(df)
+            return sheets
+            
+        raise ValueError(f"Unsupported file format: {file_ext}")
+        
+    def scan_uploaded_files(self, uploaded_files: List[Any]) -> Dict[str, List[pd.DataFrame]]:
+        """Header-only counterpart of process_uploaded_files"""
+        scanned_data = {}
+        
+        for uploaded_file in uploaded_files:
+            if Path(uploaded_file.name).suffix.lower() not in self.supported_formats:
+                continue
+            try:
+                scanned_data[uploaded_file.name] = self.scan_upload(uploaded_file, uploaded_file.name)
+            except Exception as e:
+                logging.error(f"Error scanning file {uploaded_file.name}: {str(e)}")
+                continue
+                
+        return scanned_data
+        
+    def _estimate_csv_rows(self, source: Any, sample_size: int = 64 * 1024) -> int:
+        """Estimate the data rows of a CSV from the line density of its first block"""
+        source.seek(0, os.SEEK_END)
+        total_size = source.tell()
+        source.seek(0)
+        sample = source.read(sample_size)
+        source.seek(0)
+        
+        if not sample:
+            return 0
+            
+        newline = b'\n' if isinstance(sample, bytes) else '\n'
+        line_count = sample.count(newline)
+        if len(sample) >= total_size:
+            # Whole file sampled: count a final line without a trailing newline
+            if not sample.endswith(newline):
+                line_count += 1
+        else:
+            line_count = int(line_count * total_size / len(sample))
+            
+        return max(line_count - 1, 0)
+        
+    def _estimate_sheet_rows(self, excel_file: pd.ExcelFile, sheet_name: str) -> int:
+        """Read a sheet's row count from workbook metadata without loading its cells"""
+        try:
+            book = excel_file.book
+            if hasattr(book, 'sheet_by_name'):
+                # xlrd (.xls)
+                total_rows = book.sheet_by_name(sheet_name).nrows
+            else:
+                # openpyxl (.xlsx): taken from the sheet's dimension record
+                total_rows = book[sheet_name].max_row
+            return max((total_rows or 0) - 1, 0)
+        except Exception:
+            return 0
+            
+    def get_sheet_headers(self, sheet: pd.DataFrame) -> List[str]:
+        """Return a sheet's full header, including columns skipped when it was read"""
+        return sheet.attrs.get('source_columns', list(sheet.columns))
+        
     def get_all_headers(self, processed_data: Dict[str, List[pd.DataFrame]]) -> List[str]:
         """Extract all unique headers from processed data"""
         all_headers = set()
         
         for file_name, sheets in processed_data.items():
             for sheet in sheets:
-                all_headers.update(sheet.columns.tolist())
+                all_headers.update(self.get_sheet_headers(sheet))
                 
         return sorted(list(all_headers))
         
-    def apply_header_mapping(self, df: pd.DataFrame, header_mapping: Dict[str, str]) -> pd.DataFrame:
-        """Apply header mapping to a DataFrame"""
-        df_copy = df.copy()
+    def get_mapped_columns(self, headers: List[str], header_mapping: Dict[str, str]) -> Set[str]:
+        """Return the source headers whose mapped name is one of the required headers"""
+        required_headers = set(self._get_required_headers())
+        
+        return {
+            header for header in headers
+            if header_mapping.get(header, header) in required_headers
+        }
+        
+    def _get_required_headers(self) -> List[str]:
+        """Return the standard headers, loaded once from HeaderMapper"""
+        if self._required_headers is None:
+            # Import header mapper to get required headers
+            from header_mapper import HeaderMapper
+            self._required_headers = HeaderMapper().get_required_headers()
+            
+        return self._required_headers
         
-        # Rename columns based on mapping
-        df_copy = df_copy.rename(columns=header_mapping)
+    def get_master_headers(self) -> List[str]:
+        """Return the master sheet columns: required headers plus source metadata"""
+        return self._get_required_headers() + ['source_file', 'source_sheet']
         
-        return df_copy
+    def _make_unique_columns(self, columns: pd.Index) -> List[str]:
+        """Suffix repeated column names (_1, _2, ...) so every name is unique"""
+        new_columns = []
+        col_counts = {}
+        for col in columns:
+            if col in col_counts:
+                col_counts[col] += 1
+                new_columns.append(f"{col}_{col_counts[col]}")
+            else:
+                col_counts[col] = 0
+                new_columns.append(col)
+        return new_columns
+        
+    def apply_header_mapping(self, df: pd.DataFrame, header_mapping: Dict[str, str]) -> pd.DataFrame:
+        """Apply header mapping to a DataFrame"""
+        # rename already returns a new DataFrame
+        return df.rename(columns=header_mapping)
         
     def consolidate_data(self, processed_data: Dict[str, List[pd.DataFrame]], 
-                        header_mapping: Dict[str, str]) -> pd.DataFrame:
-        """Consolidate all data into a single master DataFrame"""
-        consolidated_frames = []
+                        header_mapping: Dict[str, str], compact: bool = False) -> pd.DataFrame:
+        """Consolidate all data into a single master DataFrame
+        
+        With compact=True low-cardinality columns are stored as categoricals and
+        the rest as Arrow-backed strings instead of Python str objects.
+        """
+        sheet_plans = []
         
         for file_name, sheets in processed_data.items():
             for sheet in sheets:
                 try:
-                    # Make a copy to avoid modifying original data
-                    sheet_copy = sheet.copy()
-                    
-                    # Reset index to avoid duplicate index issues
-                    sheet_copy.reset_index(drop=True, inplace=True)
-                    
-                    # Handle duplicate column names by making them unique
-                    if sheet_copy.columns.duplicated().any():
-                        # Create unique column names
-                        new_columns = []
-                        col_counts = {}
-                        for col in sheet_copy.columns:
-                            if col in col_counts:
-                                col_counts[col] += 1
-                                new_columns.append(f"{col}_{col_counts[col]}")
-                            else:
-                                col_counts[col] = 0
-                                new_columns.append(col)
-                        sheet_copy.columns = new_columns
-                    
-                    # Apply header mapping
-                    mapped_sheet = self.apply_header_mapping(sheet_copy, header_mapping)
-                    
-                    # Add metadata columns
-                    mapped_sheet['source_file'] = sheet.attrs.get('file_name', file_name)
-                    mapped_sheet['source_sheet'] = sheet.attrs.get('sheet_name', 'Sheet1')
-                    
-                    consolidated_frames.append(mapped_sheet)
+                    source_positions = self._get_source_positions(sheet.columns, header_mapping)
+                    sheet_plans.append((
+                        sheet,
+                        source_positions,
+                        sheet.attrs.get('file_name', file_name),
+                        sheet.attrs.get('sheet_name', 'Sheet1')
+                    ))
                     
                 except Exception as e:
                     # Log the error but continue with other sheets
                     logging.error(f"Error processing sheet {sheet.attrs.get('sheet_name', 'unknown')} from {file_name}: {str(e)}")
                     continue
                 
-        if consolidated_frames:
+        if sheet_plans:
             try:
-                # Ensure all frames have unique indices
-                for i, frame in enumerate(consolidated_frames):
-                    frame.reset_index(drop=True, inplace=True)
-                
-                # Import header mapper to get required headers
-                from header_mapper import HeaderMapper
-                header_mapper = HeaderMapper()
-                required_headers = header_mapper.get_required_headers()
-                
-                # Add metadata columns to required headers
-                final_headers = required_headers + ['source_file', 'source_sheet']
-                
-                # Reindex all frames to have exactly the required headers
-                aligned_frames = []
-                for frame in consolidated_frames:
-                    # Ensure frame has unique column names before reindexing
-                    if frame.columns.duplicated().any():
-                        # Fix duplicates in this frame too
-                        new_columns = []
-                        col_counts = {}
-                        for col in frame.columns:
-                            if col in col_counts:
-                                col_counts[col] += 1
-                                new_columns.append(f"{col}_{col_counts[col]}")
-                            else:
-                                col_counts[col] = 0
-                                new_columns.append(col)
-                        frame.columns = new_columns
-                    
-                    # Reindex to only include required headers
-                    aligned_frame = frame.reindex(columns=final_headers, fill_value='')
-                    aligned_frames.append(aligned_frame)
-                
-                # Concatenate all frames
-                master_df = pd.concat(aligned_frames, ignore_index=True, sort=False)
-                
-                # Fill NaN values with empty strings for better display
-                master_df = master_df.fillna('')
-                
-                # Ensure all columns are string type for consistent display and export
-                for col in master_df.columns:
-                    master_df[col] = master_df[col].astype(str)
-                
-                return master_df
+                return self._build_master_frame(sheet_plans, compact)
                 
             except Exception as e:
                 logging.error(f"Error during concatenation: {str(e)}")
@@ -180,29 +414,270 @@ class SpreadsheetProcessor:
         else:
             return pd.DataFrame()
             
-    def get_data_summary(self, df: pd.DataFrame) -> Dict[str, Any]:
-        """Get summary statistics for the consolidated data"""
+    def _get_source_positions(self, columns: pd.Index, header_mapping: Dict[str, str]) -> Dict[str, int]:
+        """Map each master header a sheet feeds to the position of its source column
+        
+        Duplicates resolve as renaming and then reindexing would: repeated source
+        names are suffixed (_1, _2, ...) before mapping, and when several columns
+        map to the same header the first one wins.
+        """
+        mapped_columns = self.get_mapped_columns(columns, header_mapping)
+        positions = [i for i, column in enumerate(columns) if column in mapped_columns]
+        
+        names = [columns[i] for i in positions]
+        if len(set(names)) < len(names):
+            names = self._make_unique_columns(names)
+            
+        required_headers = set(self._get_required_headers())
+        source_positions = {}
+        for position, name in zip(positions, names):
+            standard_header = header_mapping.get(name, name)
+            if standard_header in required_headers:
+                source_positions.setdefault(standard_header, position)
+                
+        return source_positions
+        
+    def _stringify_column(self, column: pd.Series) -> np.ndarray:
+        """Return a column as an object array of strings, with missing values as ''"""
+        # fillna would copy (and upcast) every column, so only call it where needed
+        if column.hasnans:
+            column = column.fillna('')
+        return column.astype(str).to_numpy()
+        
+    def _build_master_frame(self, sheet_plans: List[Tuple[pd.DataFrame, Dict[str, int], str, str]], 
+                            compact: bool = False) -> pd.DataFrame:
+        """Build the master sheet from (sheet, source positions, file name, sheet name) plans
+        
+        Every cell is written once, straight from its source column, into a single
+        preallocated column-major object array, which the DataFrame then wraps
+        without copying. Peak memory is the master sheet plus one stringified
+        source column, instead of several full copies of the master. In compact
+        mode each column is encoded as soon as it is filled, so only one object
+        column exists at a time.
+        """
+        final_headers = self.get_master_headers()
+        total_rows = sum(len(sheet) for sheet, _, _, _ in sheet_plans)
+        
+        if compact:
+            columns = {}
+            for header in final_headers:
+                column_values = np.empty(total_rows, dtype=object)
+                self._fill_master_column(column_values, header, sheet_plans)
+                columns[header] = self.compact_column(column_values)
+            return pd.DataFrame(columns, copy=False)
+            
+        values = np.empty((total_rows, len(final_headers)), dtype=object, order='F')
+        for column_index, header in enumerate(final_headers):
+            # A column of a column-major array is a contiguous view
+            self._fill_master_column(values[:, column_index], header, sheet_plans)
+            
+        return pd.DataFrame(values, columns=final_headers, copy=False)
+        
+    def _fill_master_column(self, column_values: np.ndarray, header: str, 
+                            sheet_plans: List[Tuple[pd.DataFrame, Dict[str, int], str, str]]):
+        """Write one master header's values for every sheet into column_values"""
+        start = 0
+        for sheet, source_positions, file_name, sheet_name in sheet_plans:
+            end = start + len(sheet)
+            if header == 'source_file':
+                column_values[start:end] = file_name
+            elif header == 'source_sheet':
+                column_values[start:end] = sheet_name
+            elif header in source_positions:
+                column = sheet.iloc[:, source_positions[header]]
+                if self.normalize_fields and header in FIELD_TYPES:
+                    column = normalize_field(header, column)
+                column_values[start:end] = self._stringify_column(column)
+            else:
+                column_values[start:end] = ''
+            start = end
+            
+    def compact_column(self, column_values: np.ndarray) -> Any:
+        """Encode an object column of strings as a categorical or Arrow-backed strings"""
+        codes, categories = pd.factorize(column_values)
+        if len(categories) <= CATEGORY_MAX_VALUES:
+            # Reuse the factorization instead of hashing the values again
+            return pd.Categorical.from_codes(codes, categories)
+        if _COMPACT_STRING_DTYPE is None:
+            return column_values
+        return pd.array(column_values, dtype=_COMPACT_STRING_DTYPE)
+        
+    def get_affected_headers(self, headers: List[str], old_mapping: Dict[str, str], 
+                             new_mapping: Dict[str, str]) -> Set[str]:
+        """Return the master headers fed by a source header whose mapping changed"""
+        required_headers = set(self._get_required_headers())
+        affected_headers = set()
+        for header in headers:
+            old_standard = old_mapping.get(header, header)
+            new_standard = new_mapping.get(header, header)
+            if old_standard != new_standard:
+                # The column moves out of one master header and into another
+                affected_headers.update({old_standard, new_standard} & required_headers)
+        return affected_headers
+        
+    def update_master_columns(self, master_df: pd.DataFrame, processed_data: Dict[str, List[pd.DataFrame]], 
+                              header_mapping: Dict[str, str], headers: Set[str], compact: bool = False):
+        """Rebuild only the given master headers of master_df, in place
+        
+        processed_data must be the data master_df was consolidated from; every
+        other column is left untouched.
+        """
+        sheet_plans = [
+            (sheet, self._get_source_positions(sheet.columns, header_mapping), 
+             sheet.attrs.get('file_name', file_name), sheet.attrs.get('sheet_name', 'Sheet1'))
+            for file_name, sheets in processed_data.items() for sheet in sheets
+        ]
+        total_rows = sum(len(sheet) for sheet, _, _, _ in sheet_plans)
+        if total_rows != len(master_df):
+            raise ValueError("Master sheet does not match the processed data")
+            
+        for header in self.get_master_headers():
+            if header not in headers:
+                continue
+            column_values = np.empty(total_rows, dtype=object)
+            self._fill_master_column(column_values, header, sheet_plans)
+            
+            if compact:
+                master_df[header] = self.compact_column(column_values)
+            elif master_df[header].dtype == object:
+                # Writes into the existing block instead of splitting it
+                master_df.loc[:, header] = column_values
+            else:
+                master_df[header] = column_values
+                
+    def append_master(self, master_df: pd.DataFrame, new_df: pd.DataFrame) -> pd.DataFrame:
+        """Append newly consolidated rows to a master sheet
+        
+        The result equals consolidating both parts at once: compact columns get
+        the encoding a single build would choose, with categoricals merged by
+        union_categoricals (which keeps categories in order of appearance).
+        """
+        if master_df.empty:
+            return new_df
+        if new_df.empty:
+            return master_df
+            
+        object_columns = (master_df.dtypes == object).all() and (new_df.dtypes == object).all()
+        if object_columns:
+            return pd.concat([master_df, new_df], ignore_index=True)
+            
+        columns = {}
+        for header in master_df.columns:
+            columns[header] = self._append_column(master_df[header], new_df[header])
+        return pd.DataFrame(columns, copy=False)
+        
+    def _append_column(self, column: pd.Series, new_column: pd.Series) -> Any:
+        """Concatenate two compact columns into the encoding a single build would choose"""
+        if isinstance(column.dtype, pd.CategoricalDtype) and isinstance(new_column.dtype, pd.CategoricalDtype):
+            combined = union_categoricals([column.array, new_column.array])
+            if len(combined.categories) <= CATEGORY_MAX_VALUES:
+                return combined
+            return self.compact_column(np.asarray(combined, dtype=object))
+            
+        # One side is already over the category cap, so the combined column is too.
+        # Arrow-backed columns concatenate their chunks without copying
+        string_dtype = _COMPACT_STRING_DTYPE or object
+        return pd.concat([
+            column.astype(string_dtype, copy=False),
+            new_column.astype(string_dtype, copy=False)
+        ], ignore_index=True).array
+        
+    def align_sheet(self, sheet: pd.DataFrame, header_mapping: Dict[str, str], 
+                    file_name: str, sheet_name: str) -> pd.DataFrame:
+        """Map, align and stringify one sheet (or chunk) to the master sheet layout"""
+        source_positions = self._get_source_positions(sheet.columns, header_mapping)
+        return self._build_master_frame([(sheet, source_positions, file_name, sheet_name)])
+        
+    def iter_aligned_chunks(self, uploaded_files: List[Any], header_mapping: Dict[str, str], 
+                            chunksize: int = 100_000) -> Iterator[pd.DataFrame]:
+        """Yield master-sheet-aligned chunks of the uploads
+        
+        CSVs are read chunksize rows at a time (as raw text), Excel files one sheet
+        at a time, so memory is bounded by the chunk or sheet size rather than the
+        total upload size. Files that fail are logged and skipped.
+        """
+        for uploaded_file in uploaded_files:
+            file_name = uploaded_file.name
+            file_ext = Path(file_name).suffix.lower()
+            
+            try:
+                if file_ext == '.csv':
+                    uploaded_file.seek(0)
+                    header = pd.read_csv(uploaded_file, nrows=0).columns
+                    usecols = self.get_mapped_columns(header, header_mapping)
+                    uploaded_file.seek(0)
+                    
+                    # dtype=str, as in read_upload, keeps values identical across chunks and
+                    # equal to the in-memory master
+                    reader = pd.read_csv(uploaded_file, dtype=str, chunksize=chunksize,
+                                         usecols=self._column_positions(header, usecols))
+                    for chunk in reader:
+                        yield self.align_sheet(chunk, header_mapping, file_name, 'Sheet1')
+                        
+                elif file_ext in ['.xlsx', '.xls']:
+                    uploaded_file.seek(0)
+                    for sheet in self.read_workbook(uploaded_file, file_name):
+                        yield self.align_sheet(sheet, header_mapping, file_name, sheet.attrs['sheet_name'])
+                        
+            except Exception as e:
+                logging.error(f"Error streaming file {file_name}: {str(e)}")
+                continue
+                
+    def consolidate_csv_stream(self, uploaded_files: List[Any], header_mapping: Dict[str, str], 
+                               output: Any, chunksize: int = 100_000) -> int:
+        """Stream the consolidated master sheet to a CSV path or text buffer
+        
+        Returns the number of data rows written.
+        """
+        rows_written = 0
+        
+        for chunk in self.iter_aligned_chunks(uploaded_files, header_mapping, chunksize):
+            chunk.to_csv(output, index=False, header=rows_written == 0,
+                         mode='w' if rows_written == 0 else 'a')
+            rows_written += len(chunk)
+            
+        return rows_written
+        
+    def _count_sources(self, df: pd.DataFrame, column: str) -> int:
+        """Distinct source files or sheets; merged golden records list several per row"""
+        if column not in df.columns:
+            return 0
+        sources = df[column]
+        if sources.dtype == object:
+            sources = sources.explode()
+        return sources.nunique()
+        
+    def get_data_summary(self, df: pd.DataFrame, 
+                         profiles: Optional[Dict[str, Dict[str, Any]]] = None) -> Dict[str, Any]:
+        """Get summary statistics for the consolidated data
+        
+        Column counts come from column profiles; pass cached profiles of df to
+        avoid profiling it again.
+        """
         if df.empty:
             return {}
             
         summary = {
             'total_rows': len(df),
             'total_columns': len(df.columns),
-            'source_files': df['source_file'].nunique() if 'source_file' in df.columns else 0,
-            'source_sheets': df['source_sheet'].nunique() if 'source_sheet' in df.columns else 0,
+            'source_files': self._count_sources(df, 'source_file'),
+            'source_sheets': self._count_sources(df, 'source_sheet'),
             'column_info': {}
         }
         
         for col in df.columns:
             if col not in ['source_file', 'source_sheet']:
                 try:
-                    # Ensure we're working with a Series, not DataFrame
-                    col_series = df[col] if isinstance(df[col], pd.Series) else df[col].iloc[:, 0]
-                    non_empty = col_series.astype(str).str.strip().ne('').sum()
+                    profile = (profiles or {}).get(col)
+                    if profile is None:
+                        # Ensure we're working with a Series, not DataFrame
+                        col_series = df[col] if isinstance(df[col], pd.Series) else df[col].iloc[:, 0]
+                        profile = profile_column(col_series)
+                    non_empty = profile['non_empty_values']
                     summary['column_info'][col] = {
                         'non_empty_values': non_empty,
                         'empty_values': len(df) - non_empty,
-                        'data_type': str(col_series.dtype)
+                        'data_type': profile['data_type']
                     }
                 except Exception as e:
                     # Fallback for problematic columns
@@ -213,4 +688,38 @@ class SpreadsheetProcessor:
                         'error': str(e)
                     }
                 
-        return summary
\ No newline at end of file
+        return summary
+        
+    def merge_data_summary(self, summary: Dict[str, Any], new_summary: Dict[str, Any], 
+                           df: pd.DataFrame) -> Dict[str, Any]:
+        """Combine the summaries of a master sheet and appended rows into the summary of df
+        
+        Counts are added rather than recomputed; only the distinct source files and
+        sheets are counted again over df's source columns.
+        """
+        if not new_summary:
+            return summary
+        if not summary:
+            return new_summary
+            
+        merged = {
+            'total_rows': summary['total_rows'] + new_summary['total_rows'],
+            'total_columns': len(df.columns),
+            'source_files': self._count_sources(df, 'source_file'),
+            'source_sheets': self._count_sources(df, 'source_sheet'),
+            'column_info': {}
+        }
+        
+        for col, info in summary['column_info'].items():
+            new_info = new_summary['column_info'].get(col)
+            if new_info is None or 'error' in info or 'error' in new_info:
+                # Fall back to a full recount for a column that could not be summarized
+                merged['column_info'][col] = self.get_data_summary(df[[col]])['column_info'].get(col, info)
+                continue
+            merged['column_info'][col] = {
+                'non_empty_values': info['non_empty_values'] + new_info['non_empty_values'],
+                'empty_values': info['empty_values'] + new_info['empty_values'],
+                'data_type': str(df[col].dtype)
+            }
+            
+        return merged
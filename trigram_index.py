@@ -0,0 +1,166 @@
+import re
+from typing import List, Optional
+
+import numpy as np
+import pandas as pd
+
+# Shorter patterns have no trigram to look up and are matched by scanning
+TRIGRAM = 3
+
+# Characters with a meaning in a regular expression
+_REGEX_SPECIAL = frozenset('.^$*+?{}[]\\|()')
+# Quantifiers that can make the preceding character optional
+_OPTIONAL_QUANTIFIERS = frozenset('*?{')
+_REPEAT_COUNT = re.compile(r'\{\d*,?\d*\}')
+
+
+def _skip_class(pattern: str, start: int) -> int:
+    """Position after the character class opened at start"""
+    i = start + 1
+    if i < len(pattern) and pattern[i] == '^':
+        i += 1
+    if i < len(pattern) and pattern[i] == ']':
+        # A leading ']' is part of the class
+        i += 1
+    while i < len(pattern) and pattern[i] != ']':
+        i += 2 if pattern[i] == '\\' else 1
+    return i + 1
+
+
+def required_runs(pattern: str) -> List[str]:
+    """Lowercased literal runs that every match of a contains-filter regex includes
+
+    Conservative: escapes, character classes, groups, optional characters and
+    non-ASCII characters end a run instead of being interpreted, and patterns
+    with alternation or inline flags have no required runs. Every candidate is
+    verified with the real regex, so a missing run only costs verification time.
+    """
+    if '|' in pattern or '(?' in pattern:
+        return []
+
+    runs = []
+    current = ''
+    depth = 0
+    i = 0
+    while i < len(pattern):
+        char = pattern[i]
+        if depth == 0 and char not in _REGEX_SPECIAL and char.isascii() and char != '\0':
+            current += char.lower()
+            i += 1
+            continue
+
+        if char in _OPTIONAL_QUANTIFIERS:
+            current = current[:-1]
+        runs.append(current)
+        current = ''
+        if char == '\\':
+            i += 2
+        elif char == '[':
+            i = _skip_class(pattern, i)
+        elif char == '{' and _REPEAT_COUNT.match(pattern, i):
+            i = _REPEAT_COUNT.match(pattern, i).end()
+        else:
+            # Nothing inside a group is required: it may be optional or repeated
+            depth += (char == '(') - (char == ')')
+            i += 1
+    runs.append(current)
+    return [run for run in runs if len(run) >= TRIGRAM]
+
+
+def is_searchable(pattern: str) -> bool:
+    """Whether a contains-filter pattern has a literal run of at least three characters to look up"""
+    return bool(required_runs(pattern))
+
+
+class TrigramIndex:
+    """Inverted index from lowercased trigrams to the distinct values of a column containing them
+
+    Values are indexed as the contains filter sees them (astype(str)), once per
+    distinct value. Only ASCII values are indexed: case-insensitive regex
+    matching folds some non-ASCII characters onto ASCII ones ('K' is 'k'), so
+    non-ASCII values are always verified instead of risking a missed match.
+    """
+
+    def __init__(self, series: pd.Series):
+        try:
+            codes, uniques = pd.factorize(series, use_na_sentinel=False)
+        except TypeError:
+            # Lists of merged sources are matched by their string form
+            codes, uniques = pd.factorize(series.astype(str), use_na_sentinel=False)
+        self.codes = codes
+        self.values = pd.Series(uniques, dtype=object).astype(str)
+
+        ascii_values = self.values.map(str.isascii).to_numpy(dtype=bool)
+        self.unindexed = np.flatnonzero(~ascii_values)
+        indexed = np.flatnonzero(ascii_values)
+        self.keys, self.offsets, self.postings = self._build(indexed, self.values[ascii_values].str.lower())
+
+    @staticmethod
+    def _trigram_keys(chars: np.ndarray) -> np.ndarray:
+        """Trigram starting at each position of a byte array, packed into one integer"""
+        chars = chars.astype(np.uint32)
+        return (chars[:-2] << 16) | (chars[1:-1] << 8) | chars[2:]
+
+    def _build(self, ids: np.ndarray, lowered: pd.Series):
+        """Sorted distinct trigram keys with CSR offsets into their ascending distinct value ids"""
+        if len(ids) == 0:
+            return np.array([], dtype=np.uint32), np.zeros(1, dtype=np.int64), np.array([], dtype=np.int64)
+
+        # One byte string of every value, each preceded by a NUL separator
+        lengths = lowered.str.len().to_numpy()
+        chars = np.frombuffer(('\0' + '\0'.join(lowered.tolist())).encode('ascii'), dtype=np.uint8)
+        owners = np.repeat(ids, lengths + 1)
+        keys = self._trigram_keys(chars)
+        # A trigram is inside a value when it starts after the separator and ends in the same block
+        inside = (chars[:-2] != 0) & (owners[:-2] == owners[2:])
+        keys, owners = keys[inside], owners[:-2][inside]
+
+        # Stable sort keeps each posting list in ascending id order; then drop repeated trigrams
+        order = np.argsort(keys, kind='stable')
+        keys, owners = keys[order], owners[order]
+        first = np.ones(len(keys), dtype=bool)
+        first[1:] = (keys[1:] != keys[:-1]) | (owners[1:] != owners[:-1])
+        keys, owners = keys[first], owners[first]
+
+        starts = np.flatnonzero(np.r_[True, keys[1:] != keys[:-1]]) if len(keys) else np.array([], dtype=np.int64)
+        return keys[starts], np.append(starts, len(keys)), owners
+
+    def candidates(self, pattern: str) -> np.ndarray:
+        """Ids of distinct values that may match a searchable pattern"""
+        pattern_keys = np.unique(np.concatenate([
+            self._trigram_keys(np.frombuffer(run.encode('ascii'), dtype=np.uint8))
+            for run in required_runs(pattern)
+        ]))
+        positions = np.searchsorted(self.keys, pattern_keys)
+        present = positions < len(self.keys)
+        present[present] = self.keys[positions[present]] == pattern_keys[present]
+        if not present.all():
+            # A trigram no indexed value contains
+            found = np.array([], dtype=np.int64)
+        else:
+            # Intersect the shortest posting lists first
+            postings = sorted((self.postings[self.offsets[p]:self.offsets[p + 1]] for p in positions), key=len)
+            found = postings[0]
+            for posting in postings[1:]:
+                if len(found) == 0:
+                    break
+                found = np.intersect1d(found, posting, assume_unique=True)
+        return np.union1d(found, self.unindexed)
+
+    def contains(self, pattern: str) -> Optional[np.ndarray]:
+        """Row mask of str.contains(pattern, case=False), verifying only the candidates
+
+        Returns None when the pattern is not searchable; the caller then scans
+        the column. Invalid regular expressions raise re.error, as the scan does.
+        """
+        re.compile(pattern)
+        if not is_searchable(pattern):
+            return None
+        candidates = self.candidates(pattern)
+
+        matched = np.zeros(len(self.values), dtype=bool)
+        if len(candidates):
+            matched[candidates] = self.values.iloc[candidates].str.contains(
+                pattern, case=False, na=False
+            ).to_numpy(dtype=bool)
+        return matched[self.codes]